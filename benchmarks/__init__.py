@@ -0,0 +1,25 @@
+"""
+Benchmarks of the bot.
+
+Benchmarks run against a throwaway SQLite database unless
+BENCHMARK_URL_DATABASE is set, and a throwaway local image store, so they
+never touch the bot's own data.
+Run them as modules from the repository root, e.g.:
+
+    python -m benchmarks.query_rows
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "42:benchmark")
+os.environ.setdefault("ADMIN_IDS", "1")
+os.environ.setdefault("PASS_SCORE", "70")
+os.environ.setdefault("LANGUAGE", "en")
+directory = tempfile.mkdtemp(prefix="testattest-")
+os.environ["URL_DATABASE"] = os.environ.get(
+    "BENCHMARK_URL_DATABASE",
+    "sqlite+aiosqlite:///" + os.path.join(directory, "benchmark.db"),
+)
+os.environ["IMAGE_STORE"] = "local"
+os.environ["IMAGE_STORE_PATH"] = os.path.join(directory, "img")
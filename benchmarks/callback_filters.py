@@ -0,0 +1,122 @@
+"""
+Callback filter evaluation cost.
+
+Propagates callback queries through the admin and user routers with every
+handler call stubbed out, so only router filters, handler filters and
+inner middlewares run. Callback data is taken from the keyboards the bot
+sends. Reports microseconds per update for each button, from the answer
+click an examinee sends most often to admin buttons matched near the end
+of the handler list.
+
+    python -m benchmarks.callback_filters --iterations 20000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.fsm.state import default_state
+from aiogram.types import CallbackQuery
+
+from benchmarks.telegram import callback_update
+from config import config
+from database.database import Test
+from database.pagination import Page
+from database.snapshot import AnswerSnapshot, QuestionSnapshot, TestSnapshot
+from database.user_cache import UserRecord, user_cache
+from handlers import admin_handlers, user_handlers
+from handlers.user_handlers.states import FSMTesting
+from keyboard import keyboard_builder as kb
+
+USER_ID = 4_000_000
+
+
+async def stub_call(self: HandlerObject, *args: Any, **kwargs: Any) -> str:
+    return "handled"
+
+
+def first_button(keyboard, row: int = 0) -> str:
+    return keyboard.inline_keyboard[row][0].callback_data
+
+
+def scenarios() -> list[tuple[str, int, str | None, str]]:
+    """Name, sender, FSM state and callback data of every measured click."""
+    admin_id = config.bot.admin_ids[0]
+    test = Test(id=7, title="Test", description="", is_publish=True)
+    answers = (AnswerSnapshot(11, "A", True), AnswerSnapshot(12, "B", False))
+    question = QuestionSnapshot(3, "Question", None, answers)
+    snapshot = TestSnapshot(7, "Test", "", (question,))
+    results = Page(items=[(5, 80, "Test")], next_cursor=5)
+    return [
+        (
+            "answer",
+            USER_ID,
+            FSMTesting.testing.state,
+            first_button(kb.create_test_answers_keyboard(snapshot, question, answers)),
+        ),
+        (
+            "user test",
+            USER_ID,
+            default_state.state,
+            first_button(kb.create_tests_menu_keyboard(Page(items=[test]))),
+        ),
+        (
+            "admin test",
+            admin_id,
+            default_state.state,
+            first_button(kb.create_tests_menu_keyboard(Page(items=[test]), True)),
+        ),
+        (
+            "admin export",
+            admin_id,
+            default_state.state,
+            first_button(kb.create_test_menu_keyboard(test, 3, True), 1),
+        ),
+        (
+            "admin result",
+            admin_id,
+            default_state.state,
+            first_button(kb.create_user_menu_keyboard(results, user_id=9)),
+        ),
+        (
+            "admin results page",
+            admin_id,
+            default_state.state,
+            first_button(kb.create_user_menu_keyboard(results, user_id=9), 1),
+        ),
+    ]
+
+
+async def main(iterations: int) -> None:
+    HandlerObject.call = stub_call
+    user_cache.put(USER_ID, UserRecord(1, "Name", "Surname"))
+    dispatcher = Dispatcher()
+    dispatcher.include_router(admin_handlers.router)
+    dispatcher.include_router(user_handlers.router)
+
+    print(f"iterations: {iterations}")
+    print(f"{'button':<20}{'data':<28}{'handled':>8}{'us/update':>11}")
+    for name, user_id, state, data in scenarios():
+        callback = CallbackQuery.model_validate(
+            callback_update(user_id, data)["callback_query"]
+        )
+        kwargs = {"event_from_user": callback.from_user, "raw_state": state}
+        result = await dispatcher.propagate_event("callback_query", callback, **kwargs)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await dispatcher.propagate_event("callback_query", callback, **kwargs)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<20}{data:<28}{str(result == 'handled'):>8}"
+            f"{elapsed / iterations * 1_000_000:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
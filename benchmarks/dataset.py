@@ -0,0 +1,106 @@
+"""
+Synthetic dataset for benchmarks.
+
+Functions:
+    seed:
+        Fill an empty database with tests, questions, users and results.
+"""
+
+import random
+
+from sqlalchemy import insert
+
+from database.database import (
+    Answer,
+    Base,
+    IncorrectAnswer,
+    Question,
+    Result,
+    Session,
+    Test,
+    User,
+    engine,
+)
+from database.statistics import rebuild
+
+ANSWERS_PER_QUESTION = 4
+
+
+async def seed(
+    tests: int = 20,
+    questions: int = 30,
+    users: int = 200,
+    results_per_user: int = 5,
+    seed: int = 0,
+) -> None:
+    """Fill an empty database with tests, questions, users and results."""
+    rnd = random.Random(seed)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+    test_rows = [
+        {"id": t, "title": f"Test {t}", "description": "", "is_publish": True}
+        for t in range(1, tests + 1)
+    ]
+    question_rows = []
+    answer_rows = []
+    for t in range(1, tests + 1):
+        for q in range(questions):
+            question_id = (t - 1) * questions + q + 1
+            question_rows.append(
+                {"id": question_id, "test_id": t, "text": f"Question {question_id}"}
+            )
+            for a in range(ANSWERS_PER_QUESTION):
+                answer_rows.append(
+                    {
+                        "id": (question_id - 1) * ANSWERS_PER_QUESTION + a + 1,
+                        "question_id": question_id,
+                        "text": f"Answer {a}",
+                        "is_correct": a == 0,
+                    }
+                )
+
+    user_rows = [
+        {"id": u, "tg_id": 10_000 + u, "name": "User", "surname": str(u)}
+        for u in range(1, users + 1)
+    ]
+    result_rows = []
+    incorrect_rows = []
+    for u in range(1, users + 1):
+        for t in rnd.sample(range(1, tests + 1), min(results_per_user, tests)):
+            wrong = rnd.sample(range(questions), rnd.randint(0, questions // 2))
+            result_id = len(result_rows) + 1
+            result_rows.append(
+                {
+                    "id": result_id,
+                    "user_id": u,
+                    "test_id": t,
+                    "score": round((questions - len(wrong)) / questions * 100),
+                }
+            )
+            for q in wrong:
+                question_id = (t - 1) * questions + q + 1
+                incorrect_rows.append(
+                    {
+                        "result_id": result_id,
+                        "question_id": question_id,
+                        "answer_id": (question_id - 1) * ANSWERS_PER_QUESTION + 2,
+                    }
+                )
+
+    async with Session() as session:
+        for model, rows in (
+            (Test, test_rows),
+            (Question, question_rows),
+            (Answer, answer_rows),
+            (User, user_rows),
+            (Result, result_rows),
+            (IncorrectAnswer, incorrect_rows),
+        ):
+            if rows:
+                await session.execute(insert(model), rows)
+        await session.commit()
+
+    await rebuild()
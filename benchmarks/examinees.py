@@ -0,0 +1,140 @@
+"""
+Load test: many examinees taking a test at once.
+
+Builds the Dispatcher with the admin and user routers, a fake Telegram
+session and the configured FSM storage, then plays every examinee through
+/start, name registration, the start test button and one answer click per
+question, pressing buttons from the keyboards the bot actually sent.
+Reports handler latency percentiles per step, database statements per
+update, throughput, keyboard cache hits, photo uploads to Telegram and
+failed updates.
+With --images every question has an image.
+
+    python -m benchmarks.examinees --examinees 1000 --questions 30 --images
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from sqlalchemy import event, update
+
+from benchmarks.dataset import seed
+from benchmarks.telegram import FakeSession, callback_update, message_update
+from config import config
+from database.database import Question, Session, engine
+from database.result_queue import result_queue
+from database.storage import create_storage
+from handlers import admin_handlers, user_handlers
+from keyboard.cache import keyboard_cache
+from keyboard.callback_data import TestCallback
+from utils.image_store import image_store
+
+TEST_ID = 1
+
+
+class LoadTest:
+    """Play examinees against the dispatcher and collect measurements."""
+
+    def __init__(self, questions: int, seed: int) -> None:
+        self.questions = questions
+        self.random = random.Random(seed)
+        self.session = FakeSession()
+        self.bot = Bot(token=config.bot.token, session=self.session)
+        self.dispatcher = Dispatcher(storage=create_storage(config.storage))
+        self.dispatcher.include_router(admin_handlers.router)
+        self.dispatcher.include_router(user_handlers.router)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.statements = 0
+        event.listen(engine.sync_engine, "after_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.statements += 1
+
+    async def feed(self, step: str, update: dict) -> None:
+        """Feed one update and record its latency."""
+        started = time.perf_counter()
+        try:
+            await self.dispatcher.feed_update(self.bot, Update.model_validate(update))
+        except Exception:
+            self.errors[step] += 1
+        self.latencies[step].append(time.perf_counter() - started)
+
+    def press(self, user_id: int) -> str:
+        """Pick a random button from the last keyboard sent to the user."""
+        keyboard = self.session.keyboards[user_id]
+        row = self.random.choice(keyboard.inline_keyboard)
+        return self.random.choice(row).callback_data
+
+    async def examinee(self, user_id: int) -> None:
+        """Play one examinee from /start to the last answer."""
+        await self.feed("start", message_update(user_id, "/start"))
+        await self.feed("name", message_update(user_id, f"Name{user_id} Surname"))
+        start = TestCallback(action="start", test_id=TEST_ID).pack()
+        await self.feed("start_test", callback_update(user_id, start))
+        for _ in range(self.questions):
+            await self.feed("answer", callback_update(user_id, self.press(user_id)))
+
+
+def percentile(values: list[float], p: int) -> float:
+    return statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else values[0]
+
+
+async def main(
+    examinees: int, questions: int, concurrency: int, seed_: int, images: bool
+) -> None:
+    await seed(tests=1, questions=questions, users=0)
+    if images:
+        image = await image_store.put(b"benchmark image")
+        async with Session() as session:
+            await session.execute(update(Question).values(image=image))
+            await session.commit()
+    load_test = LoadTest(questions=questions, seed=seed_)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(user_id: int) -> None:
+        async with semaphore:
+            await load_test.examinee(user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(2_000_000 + i) for i in range(examinees)))
+    await result_queue.close()
+    elapsed = time.perf_counter() - started
+
+    updates = sum(len(values) for values in load_test.latencies.values())
+    print(f"examinees: {examinees}, questions: {questions}, concurrency: {concurrency}")
+    print(f"updates: {updates} in {elapsed:.2f}s ({updates / elapsed:.0f}/s)")
+    print(f"statements per update: {load_test.statements / updates:.2f}")
+    print(f"result queue: {result_queue.stats()}")
+    print(f"keyboard cache: {keyboard_cache.stats()}")
+    print(f"photo uploads: {load_test.session.uploads}")
+    print(f"{'step':<12}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, values in load_test.latencies.items():
+        print(
+            f"{step:<12}{len(values):>8}{load_test.errors[step]:>8}"
+            f"{percentile(values, 50) * 1000:>10.1f}"
+            f"{percentile(values, 95) * 1000:>10.1f}"
+            f"{percentile(values, 99) * 1000:>10.1f}"
+        )
+
+    await load_test.dispatcher.storage.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--examinees", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--images", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.examinees, args.questions, args.concurrency, args.seed, args.images)
+    )
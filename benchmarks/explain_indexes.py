@@ -0,0 +1,131 @@
+"""
+Index usage of the hot lookup queries.
+
+Runs the queries behind user_connect.get_tests,
+admin_connect.get_statistics_by_test_id and
+admin_connect.get_result_data_by_result (plus the snapshot and result
+lookups and the statistics rebuild of a test) on a migrated database,
+asks the database for their plans and checks that the expected indexes
+appear. Exits with status 1 otherwise.
+
+    python -m benchmarks.explain_indexes
+"""
+
+import asyncio
+import sys
+from typing import Awaitable, Callable
+
+from sqlalchemy import event
+
+from benchmarks.dataset import seed
+from database import admin_connect, user_connect
+from database.cache import test_cache
+from database.database import engine
+from database.migrations import upgrade
+from database.statistics import rebuild_test_statistics
+
+# Primary key lookups appear as the automatic index in SQLite plans and as
+# the named primary key constraint in PostgreSQL plans
+PRIMARY_KEYS = {
+    "test_statistics": (
+        "test_statistics USING INTEGER PRIMARY KEY",
+        "test_statistics_pkey",
+    ),
+    "test_score_buckets": (
+        "sqlite_autoindex_test_score_buckets_1",
+        "test_score_buckets_pkey",
+    ),
+}
+
+
+async def explain(call: Callable[[], Awaitable]) -> str:
+    """Run call and return the plans of the SELECT and INSERT statements."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "after_cursor_execute", record)
+    try:
+        await call()
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", record)
+
+    prefix = "EXPLAIN QUERY PLAN" if engine.dialect.name == "sqlite" else "EXPLAIN"
+    plans = []
+    async with engine.connect() as connection:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith(("SELECT", "INSERT")):
+                plan = await connection.exec_driver_sql(
+                    f"{prefix} {statement}", parameters
+                )
+                plans.extend(" ".join(map(str, row)) for row in plan)
+    return "\n".join(plans)
+
+
+async def main() -> int:
+    await seed()
+    await upgrade()
+    async with engine.begin() as connection:
+        await connection.exec_driver_sql("ANALYZE")
+
+    async def get_test_snapshot() -> None:
+        test_cache.invalidate(1)
+        await user_connect.get_test_snapshot(1)
+
+    async def rebuild_statistics() -> None:
+        async with engine.connect() as connection:
+            await rebuild_test_statistics(connection, [1])
+            await connection.rollback()
+
+    result = await admin_connect.get_result_by_id(1)
+    # Every expected index is a name or a tuple of alternative names
+    checks: dict[str, tuple[Callable[[], Awaitable], list[str | tuple]]] = {
+        "user.get_tests": (
+            lambda: user_connect.get_tests(10_001),
+            ["ix_results_user_id_test_id_score"],
+        ),
+        "admin.get_statistics_by_test_id": (
+            lambda: admin_connect.get_statistics_by_test_id(1),
+            [PRIMARY_KEYS["test_statistics"], PRIMARY_KEYS["test_score_buckets"]],
+        ),
+        "statistics.rebuild_test_statistics": (
+            rebuild_statistics,
+            ["ix_results_test_id_score"],
+        ),
+        "admin.get_result_data_by_result": (
+            lambda: admin_connect.get_result_data_by_result(result),
+            ["ix_incorrect_answers_result_id", "ix_answers_question_id_is_correct"],
+        ),
+        "admin.get_results_by_user_id": (
+            lambda: admin_connect.get_results_by_user_id(1),
+            ["ix_results_user_id_test_id_score"],
+        ),
+        "user.get_test_snapshot": (
+            get_test_snapshot,
+            ["ix_questions_test_id", "ix_answers_question_id_is_correct"],
+        ),
+    }
+
+    failed = 0
+    for name, (call, indexes) in checks.items():
+        plan = await explain(call)
+        missing = [
+            " or ".join(index) if isinstance(index, tuple) else index
+            for index in indexes
+            if not any(
+                alternative in plan
+                for alternative in (index if isinstance(index, tuple) else (index,))
+            )
+        ]
+        print(f"{'FAIL' if missing else 'ok':<6}{name}")
+        if missing:
+            failed += 1
+            print(f"      missing: {', '.join(missing)}\n      plan:\n{plan}")
+
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
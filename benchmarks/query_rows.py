@@ -0,0 +1,101 @@
+"""
+Statements and rows fetched per data access call.
+
+Seeds a synthetic dataset and, for each admin_connect/user_connect read,
+reports how many statements it issued and how many rows those statements
+returned. A relationship that starts eager-loading again shows up as a jump
+in the rows column.
+
+    python -m benchmarks.query_rows
+"""
+
+import asyncio
+from typing import Awaitable, Callable
+
+from sqlalchemy import event
+
+from benchmarks.dataset import seed
+from database import admin_connect, user_connect
+from database.cache import test_cache
+from database.database import engine
+
+
+class StatementRecorder:
+    """Record statements executed on the engine."""
+
+    def __init__(self) -> None:
+        self.statements: list[tuple[str, object]] = []
+        self.enabled = False
+        event.listen(engine.sync_engine, "after_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            self.statements.append((statement, parameters))
+
+    async def measure(self, call: Callable[[], Awaitable]) -> tuple[int, int]:
+        """Run call and return its statement and fetched row counts."""
+        self.statements = []
+        self.enabled = True
+        try:
+            await call()
+        finally:
+            self.enabled = False
+
+        rows = 0
+        async with engine.connect() as connection:
+            for statement, parameters in self.statements:
+                if not statement.lstrip().upper().startswith("SELECT"):
+                    continue
+                counted = await connection.exec_driver_sql(
+                    f"SELECT count(*) FROM ({statement}) AS counted", parameters
+                )
+                rows += counted.scalar()
+        return len(self.statements), rows
+
+
+async def main() -> None:
+    await seed()
+    recorder = StatementRecorder()
+    result = await admin_connect.get_result_by_id(1)
+
+    async def get_test_snapshot() -> None:
+        test_cache.invalidate(1)
+        await user_connect.get_test_snapshot(1)
+
+    calls = {
+        "admin.get_tests": admin_connect.get_tests,
+        "admin.get_test_by_id": lambda: admin_connect.get_test_by_id(1),
+        "admin.get_test_by_question_id": (
+            lambda: admin_connect.get_test_by_question_id(1)
+        ),
+        "admin.get_statistics_by_test_id": (
+            lambda: admin_connect.get_statistics_by_test_id(1)
+        ),
+        "admin.get_questions_by_test_id": (
+            lambda: admin_connect.get_questions_by_test_id(1)
+        ),
+        "admin.get_question_by_id": lambda: admin_connect.get_question_by_id(1),
+        "admin.get_users": admin_connect.get_users,
+        "admin.get_user_by_id": lambda: admin_connect.get_user_by_id(1),
+        "admin.get_results_by_user_id": (
+            lambda: admin_connect.get_results_by_user_id(1)
+        ),
+        "admin.get_result_by_id": lambda: admin_connect.get_result_by_id(1),
+        "admin.get_result_data_by_result": (
+            lambda: admin_connect.get_result_data_by_result(result)
+        ),
+        "user.get_user": lambda: user_connect.get_user(10_001),
+        "user.get_tests": lambda: user_connect.get_tests(10_001),
+        "user.get_test_snapshot": get_test_snapshot,
+    }
+
+    print(f"{'call':<36}{'statements':>12}{'rows':>10}")
+    for name, call in calls.items():
+        statements, rows = await recorder.measure(call)
+        print(f"{name:<36}{statements:>12}{rows:>10}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
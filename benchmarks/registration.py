@@ -0,0 +1,86 @@
+"""
+Concurrent registration.
+
+Plays many new users through /start and name input at once, every user
+sending the name twice in parallel as a double-send would, then checks
+that every user is stored exactly once with the name sent, that the user
+cache holds them, and that no update failed. Reports throughput and
+handler latency percentiles, and exits with status 1 if a check fails.
+
+    python -m benchmarks.registration --users 5000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlalchemy import select
+
+from benchmarks.dataset import seed
+from benchmarks.examinees import LoadTest, percentile
+from benchmarks.telegram import message_update
+from database.database import Session, User, engine
+from database.user_cache import user_cache
+
+FIRST_USER_ID = 3_000_000
+
+
+async def main(users: int, concurrency: int) -> int:
+    await seed(tests=1, questions=1, users=0)
+    load_test = LoadTest(questions=0, seed=0)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def register(user_id: int) -> None:
+        async with semaphore:
+            await load_test.feed("start", message_update(user_id, "/start"))
+            name = message_update(user_id, f"Name{user_id} Surname")
+            await asyncio.gather(
+                load_test.feed("name", name), load_test.feed("name", name)
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(register(FIRST_USER_ID + i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+
+    async with Session() as session:
+        rows = await session.execute(
+            select(User.tg_id, User.name).where(User.tg_id >= FIRST_USER_ID)
+        )
+        rows = rows.all()
+    wrong_names = sum(name != f"Name{tg_id}" for tg_id, name in rows)
+
+    print(f"users: {users}, concurrency: {concurrency}")
+    print(f"registered in {elapsed:.2f}s ({users / elapsed:.0f} users/s)")
+    print(f"stored users: {len(rows)}, wrong names: {wrong_names}")
+    print(f"user cache: {user_cache.stats()}")
+    print(f"{'step':<12}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, values in load_test.latencies.items():
+        print(
+            f"{step:<12}{len(values):>8}{load_test.errors[step]:>8}"
+            f"{percentile(values, 50) * 1000:>10.1f}"
+            f"{percentile(values, 95) * 1000:>10.1f}"
+            f"{percentile(values, 99) * 1000:>10.1f}"
+        )
+
+    await load_test.dispatcher.storage.close()
+    await engine.dispose()
+
+    failed = []
+    if len(rows) != users:
+        failed.append(f"{len(rows)} of {users} users stored")
+    if wrong_names:
+        failed.append(f"{wrong_names} wrong names")
+    if any(load_test.errors.values()):
+        failed.append(f"failed updates: {dict(load_test.errors)}")
+    for failure in failed:
+        print(f"FAIL  {failure}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.concurrency)))
@@ -0,0 +1,239 @@
+"""
+Image store on the S3 backend against a local fake of S3.
+
+Starts an aiohttp app on localhost that serves PUT, GET, DELETE and
+ListObjectsV2 on path-style URLs and rejects any request whose AWS
+Signature Version 4 or payload hash does not match, then runs the store
+through put, get, list, modified, release and collect_garbage on it.
+Listings are cut into pages of two keys, so continuation tokens are used.
+Exits with status 1 if any check fails.
+
+    python -m benchmarks.s3_store
+"""
+
+import asyncio
+import hashlib
+import hmac
+import sys
+from datetime import datetime, timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+from utils.image_store import ImageStore, S3ImageBackend
+
+BUCKET = "questions"
+ACCESS_KEY = "access"
+SECRET_KEY = "secret"
+REGION = "us-east-1"
+# Keys per page of a listing
+PAGE_SIZE = 2
+
+
+class FakeS3:
+    """
+    One bucket of an S3 storage kept in memory.
+
+    Attributes:
+        objects: dict[str, tuple[bytes, datetime]] - body and modification
+            time by key
+        requests: int - number of accepted requests
+        rejected: int - number of requests with a wrong signature
+    """
+
+    def __init__(self) -> None:
+        self.objects: dict[str, tuple[bytes, datetime]] = {}
+        self.requests = 0
+        self.rejected = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/{bucket}/{key:.*}", self.handle)
+        return app
+
+    def _signature(self, request: web.Request, body: bytes) -> str | None:
+        """Signature the request should carry, None if it is malformed."""
+        try:
+            algorithm, fields = request.headers["Authorization"].split(" ", 1)
+            fields = dict(field.strip().split("=", 1) for field in fields.split(","))
+            _, date, region, service, _ = fields["Credential"].split("/")
+            signed_headers = fields["SignedHeaders"].split(";")
+            amz_date = request.headers["x-amz-date"]
+            payload_hash = request.headers["x-amz-content-sha256"]
+        except (KeyError, ValueError):
+            return None
+        if algorithm != "AWS4-HMAC-SHA256" or payload_hash != (
+            hashlib.sha256(body).hexdigest()
+        ):
+            return None
+        canonical_request = "\n".join(
+            (
+                request.method,
+                quote(request.path, safe="/-_.~"),
+                "&".join(
+                    f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+                    for name, value in sorted(request.query.items())
+                ),
+                "".join(
+                    f"{name}:{request.headers[name].strip()}\n"
+                    for name in signed_headers
+                ),
+                ";".join(signed_headers),
+                payload_hash,
+            )
+        )
+        scope = f"{date}/{region}/{service}/aws4_request"
+        string_to_sign = "\n".join(
+            (
+                algorithm,
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            )
+        )
+        key = f"AWS4{SECRET_KEY}".encode()
+        for part in (date, region, service, "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        signature = request.headers.get("Authorization", "").rpartition("Signature=")[2]
+        expected = self._signature(request, body)
+        if expected is None or not hmac.compare_digest(signature, expected):
+            self.rejected += 1
+            return web.Response(status=403, text="SignatureDoesNotMatch")
+        if request.match_info["bucket"] != BUCKET:
+            return web.Response(status=404, text="NoSuchBucket")
+        self.requests += 1
+        key = request.match_info["key"]
+        if request.method == "PUT":
+            self.objects[key] = (body, datetime.now(timezone.utc))
+            return web.Response()
+        if request.method == "DELETE":
+            self.objects.pop(key, None)
+            return web.Response(status=204)
+        if request.method == "GET" and key:
+            if key not in self.objects:
+                return web.Response(status=404, text="NoSuchKey")
+            return web.Response(body=self.objects[key][0])
+        if request.method == "GET" and request.query.get("list-type") == "2":
+            return web.Response(
+                text=self._list(
+                    request.query.get("prefix", ""),
+                    request.query.get("continuation-token"),
+                ),
+                content_type="application/xml",
+            )
+        return web.Response(status=400)
+
+    def _list(self, prefix: str, token: str | None) -> str:
+        keys = sorted(key for key in self.objects if key.startswith(prefix))
+        start = int(token.removeprefix("page/")) if token else 0
+        page = keys[start : start + PAGE_SIZE]
+        truncated = start + PAGE_SIZE < len(keys)
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><LastModified>"
+            f"{self.objects[key][1].isoformat(timespec='milliseconds')[:-6]}Z"
+            f"</LastModified></Contents>"
+            for key in page
+        )
+        next_token = (
+            f"<NextContinuationToken>page/{start + PAGE_SIZE}</NextContinuationToken>"
+            if truncated
+            else ""
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<IsTruncated>{str(truncated).lower()}</IsTruncated>"
+            f"{contents}{next_token}</ListBucketResult>"
+        )
+
+
+async def main() -> int:
+    fake = FakeS3()
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}"
+    store = ImageStore(S3ImageBackend(url, BUCKET, ACCESS_KEY, SECRET_KEY, REGION))
+    forged = S3ImageBackend(url, BUCKET, ACCESS_KEY, "wrong", REGION)
+
+    failed = 0
+
+    def check(name: str, ok: bool) -> None:
+        nonlocal failed
+        failed += not ok
+        print(f"{'ok' if ok else 'FAIL':4} {name}")
+
+    try:
+        images = [f"image {number}".encode() * 100 for number in range(5)]
+        keys = [await store.put(image) for image in images]
+        check("put stores every image", len(fake.objects) == len(images))
+        check(
+            "get returns the stored bytes",
+            [await store.get(key) for key in keys] == images,
+        )
+        try:
+            await store.get("0" * 64 + ".jpg")
+            check("get of a missing image raises", False)
+        except FileNotFoundError:
+            check("get of a missing image raises", True)
+
+        listed = [key async for key, _ in store.backend.list()]
+        check("list pages through every key", sorted(listed) == sorted(keys))
+        modified = await store.backend.modified(keys[0])
+        check(
+            "modified matches the bucket",
+            modified is not None
+            and abs(modified - fake.objects[keys[0]][1]).total_seconds() < 0.001,
+        )
+        check(
+            "modified of a missing image is None",
+            await store.backend.modified("f" * 64 + ".jpg") is None,
+        )
+
+        await asyncio.sleep(0.01)
+        await store.put(images[0])
+        check(
+            "put of a stored image refreshes it",
+            await store.backend.modified(keys[0]) > modified,
+        )
+
+        async def get_referenced(candidates: list[str]) -> set[str]:
+            return {keys[1]} & set(candidates)
+
+        released = await store.release(keys[:3], get_referenced, grace=3600)
+        check("release keeps young images", released == 0)
+        released = await store.release(keys[:3], get_referenced, grace=0)
+        check(
+            "release deletes only unreferenced images",
+            released == 2 and set(fake.objects) == {keys[1], keys[3], keys[4]},
+        )
+        collected = await store.collect_garbage({keys[1]}, grace=0)
+        check(
+            "collect_garbage deletes only unreferenced images",
+            collected == 2 and set(fake.objects) == {keys[1]},
+        )
+
+        try:
+            await forged.put(keys[0], images[0])
+            check("wrong secret is rejected", False)
+        except OSError:
+            check("wrong secret is rejected", fake.rejected == 1)
+        check("every store request was signed correctly", fake.rejected == 1)
+    finally:
+        await store.close()
+        await forged.close()
+        await runner.cleanup()
+
+    print(f"{fake.requests} requests, {failed} failed checks")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
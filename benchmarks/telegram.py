@@ -0,0 +1,117 @@
+"""
+Fake Telegram side for benchmarks.
+
+Classes:
+    FakeSession - bot session that answers API calls locally.
+
+Functions:
+    message_update:
+        Builds raw Update JSON for a text message.
+    callback_update:
+        Builds raw Update JSON for a callback query.
+"""
+
+import itertools
+import time
+import typing
+from collections import Counter
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, InlineKeyboardMarkup, InputFile, Message, PhotoSize
+
+_ids = itertools.count(1)
+
+
+class FakeSession(BaseSession):
+    """
+    Bot session that answers API calls locally.
+
+    Methods returning a Message get a minimal message in the same chat,
+    everything else gets True. Calls are counted per method name, and the
+    last inline keyboard sent to each chat is kept so a simulated user can
+    press its buttons. Photos sent as files are counted as uploads and get
+    a new file_id, photos sent by file_id are passed through.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: Counter[str] = Counter()
+        self.keyboards: dict[int, InlineKeyboardMarkup] = {}
+        self.uploads = 0
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod, timeout: int | None = None
+    ) -> Any:
+        self.calls[type(method).__name__] += 1
+        chat_id = getattr(method, "chat_id", None) or 0
+        markup = getattr(method, "reply_markup", None)
+        if isinstance(markup, InlineKeyboardMarkup):
+            self.keyboards[chat_id] = markup
+        returning = method.__returning__
+        if returning is Message or Message in typing.get_args(returning):
+            photo = getattr(method, "photo", None)
+            if isinstance(photo, InputFile):
+                self.uploads += 1
+                photo = f"file-{next(_ids)}"
+            return Message(
+                message_id=next(_ids),
+                date=int(time.time()),
+                chat=Chat(id=chat_id, type="private"),
+                text=getattr(method, "text", None),
+                photo=[
+                    PhotoSize(file_id=photo, file_unique_id=photo, width=1, height=1)
+                ]
+                if photo
+                else None,
+            ).as_(bot)
+        return True
+
+    async def stream_content(
+        self, url: str, timeout: int, chunk_size: int, raise_for_status: bool
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+
+def _user(user_id: int) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+
+
+def _message(user_id: int, text: str | None = None) -> dict[str, Any]:
+    message = {
+        "message_id": next(_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+    }
+    if text is not None:
+        message["text"] = text
+        if text.startswith("/"):
+            message["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+            ]
+    return message
+
+
+def message_update(user_id: int, text: str) -> dict[str, Any]:
+    """Builds raw Update JSON for a text message."""
+    return {"update_id": next(_ids), "message": _message(user_id, text)}
+
+
+def callback_update(user_id: int, data: str) -> dict[str, Any]:
+    """Builds raw Update JSON for a callback query."""
+    return {
+        "update_id": next(_ids),
+        "callback_query": {
+            "id": str(next(_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": _message(user_id, "question"),
+            "data": data,
+        },
+    }
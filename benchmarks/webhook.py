@@ -0,0 +1,82 @@
+"""
+Webhook throughput.
+
+Starts the webhook application on a local port with a fake Telegram
+session and posts synthetic /start updates from distinct users at it.
+Reports how fast updates are accepted and how fast the dispatcher
+finishes processing them.
+
+    python -m benchmarks.webhook --updates 2000 --clients 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+from benchmarks.telegram import FakeSession, message_update
+from config import WebhookConfig, config
+from database.database import create_tables, engine
+from handlers import admin_handlers, user_handlers
+from webhook import create_app
+
+
+async def main(updates: int, clients: int, max_concurrency: int) -> None:
+    await create_tables()
+
+    session = FakeSession()
+    bot = Bot(token=config.bot.token, session=session, parse_mode="HTML")
+    dp = Dispatcher()
+    dp.include_router(admin_handlers.router)
+    dp.include_router(user_handlers.router)
+
+    webhook_config = WebhookConfig(
+        url="http://localhost",
+        path="/webhook",
+        host="127.0.0.1",
+        port=0,
+        secret="benchmark",
+        max_concurrency=max_concurrency,
+    )
+    app = create_app(dp, bot, webhook_config)
+    handler = app["webhook_handler"]
+    payloads = [message_update(1_000_000 + i, "/start") for i in range(updates)]
+    queue: asyncio.Queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    async with TestServer(app) as server, ClientSession() as client:
+        url = str(server.make_url(webhook_config.path))
+        headers = {"X-Telegram-Bot-Api-Secret-Token": webhook_config.secret}
+
+        async def post() -> None:
+            while not queue.empty():
+                payload = queue.get_nowait()
+                async with client.post(url, json=payload, headers=headers) as resp:
+                    resp.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post() for _ in range(clients)))
+        accepted = time.perf_counter() - started
+        while handler.tasks:
+            await asyncio.gather(*handler.tasks, return_exceptions=True)
+        processed = time.perf_counter() - started
+
+    print(f"updates:              {updates}")
+    print(f"accepted in:          {accepted:.2f}s ({updates / accepted:.0f}/s)")
+    print(f"processed in:         {processed:.2f}s ({updates / processed:.0f}/s)")
+    print(f"bot API calls:        {dict(session.calls)}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--max-concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.updates, args.clients, args.max_concurrency))
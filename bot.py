@@ -1,24 +1,45 @@
 import asyncio
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
 from loguru import logger
 
 from config import config, lexicon
+from database.database import engine
+from database.migrations import upgrade
+from database.result_queue import result_queue
+from database.storage import SQLStorage, create_storage
 from handlers import admin_handlers, user_handlers
+from middlewares import setup_middlewares
+from utils.image_store import image_store
+from webhook import run_webhook
 
 
 async def main() -> None:
-    storage: MemoryStorage = MemoryStorage()
+    await upgrade()
+
+    storage: BaseStorage = create_storage(config.storage)
+    if isinstance(storage, SQLStorage):
+        await storage.delete_expired()
 
     bot = Bot(token=config.bot.token, parse_mode="HTML")
     dp = Dispatcher(storage=storage)
+    setup_middlewares(dp, config.throttling)
 
     dp.include_router(admin_handlers.router)
     dp.include_router(user_handlers.router)
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        if config.webhook.url:
+            await run_webhook(dp, bot, config.webhook)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
+    finally:
+        await result_queue.close()
+        await storage.close()
+        await image_store.close()
+        await engine.dispose()
 
 
 if __name__ == "__main__":
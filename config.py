@@ -4,6 +4,10 @@ The config module.
 Classes:
     BotConfig - configuration of the bot.
     DatabaseConfig - configuration of the database.
+    StorageConfig - configuration of the FSM storage.
+    WebhookConfig - configuration of the webhook server.
+    ImageStoreConfig - configuration of the question image store.
+    ThrottlingConfig - configuration of the per-user update limits.
     Config - configuration of the application.
 
 Functions:
@@ -28,9 +32,104 @@ class BotConfig:
 
 @dataclass
 class DatabaseConfig:
-    """Configuration of the database."""
+    """
+    Configuration of the database.
+
+    Attributes:
+        url: str - database URL
+        result_batch_size: int - maximum number of results saved at once
+        result_flush_interval: float - seconds a result may wait in the queue
+        user_cache_size: int - maximum number of users kept in the user cache
+        user_cache_ttl: float - seconds a user is kept in the user cache
+        analytics_ttl: float - seconds question analytics totals are kept
+    """
 
     url: str
+    result_batch_size: int
+    result_flush_interval: float
+    user_cache_size: int
+    user_cache_ttl: float
+    analytics_ttl: float
+
+
+@dataclass
+class StorageConfig:
+    """
+    Configuration of the FSM storage.
+
+    Attributes:
+        type: str - storage backend: memory, redis or sql
+        url: str | None - Redis URL for the redis backend
+        ttl: int | None - seconds of inactivity before a record expires
+    """
+
+    type: str
+    url: str | None
+    ttl: int | None
+
+
+@dataclass
+class WebhookConfig:
+    """
+    Configuration of the webhook server.
+
+    Attributes:
+        url: str | None - public base URL; polling is used when empty
+        path: str - path of the webhook endpoint
+        host: str - address the server listens on
+        port: int - port the server listens on
+        secret: str | None - secret token Telegram sends with each update
+        max_concurrency: int - maximum number of updates handled at once
+    """
+
+    url: str | None
+    path: str
+    host: str
+    port: int
+    secret: str | None
+    max_concurrency: int
+
+
+@dataclass
+class ImageStoreConfig:
+    """
+    Configuration of the question image store.
+
+    Attributes:
+        type: str - store backend: local or s3
+        path: str - directory of the local backend
+        url: str | None - endpoint URL of the S3-compatible backend
+        bucket: str | None - bucket of the S3-compatible backend
+        access_key: str | None - access key of the S3-compatible backend
+        secret_key: str | None - secret key of the S3-compatible backend
+        region: str - region of the S3-compatible backend
+        gc_grace: int - seconds an unreferenced image is kept before collection
+    """
+
+    type: str
+    path: str
+    url: str | None
+    bucket: str | None
+    access_key: str | None
+    secret_key: str | None
+    region: str
+    gc_grace: int
+
+
+@dataclass
+class ThrottlingConfig:
+    """
+    Configuration of the per-user update limits.
+
+    Attributes:
+        rate: float - updates per second a user may send; 0 disables the limit
+        burst: int - updates a user may send at once after being idle
+        answer_debounce: float - seconds repeated answers to a question are dropped
+    """
+
+    rate: float
+    burst: int
+    answer_debounce: float
 
 
 @dataclass
@@ -41,14 +140,26 @@ class Config:
     Attributes:
         bot: BotConfig
         database: DatabaseConfig
+        storage: StorageConfig
+        webhook: WebhookConfig
+        images: ImageStoreConfig
+        throttling: ThrottlingConfig
         pass_score: int - minimum score to pass the test
         language: str - language
+        page_size: int - number of items on a list page
+        shuffle_questions: bool - show questions of a test in random order
     """
 
     bot: BotConfig
     database: DatabaseConfig
+    storage: StorageConfig
+    webhook: WebhookConfig
+    images: ImageStoreConfig
+    throttling: ThrottlingConfig
     pass_score: int
     language: str
+    page_size: int
+    shuffle_questions: bool
 
 
 def load_config(path: str = None) -> Config:
@@ -61,9 +172,46 @@ def load_config(path: str = None) -> Config:
             token=env("BOT_TOKEN"),
             admin_ids=[int(admin_id) for admin_id in env.list("ADMIN_IDS")],
         ),
-        database=DatabaseConfig(url=env("URL_DATABASE")),
+        database=DatabaseConfig(
+            url=env("URL_DATABASE"),
+            result_batch_size=env.int("RESULT_BATCH_SIZE", 100),
+            result_flush_interval=env.float("RESULT_FLUSH_INTERVAL", 1.0),
+            user_cache_size=env.int("USER_CACHE_SIZE", 10000),
+            user_cache_ttl=env.float("USER_CACHE_TTL", 3600),
+            analytics_ttl=env.float("ANALYTICS_TTL", 600),
+        ),
+        storage=StorageConfig(
+            type=env("STORAGE", "memory"),
+            url=env("URL_STORAGE", None),
+            ttl=env.int("STORAGE_TTL", 86400) or None,
+        ),
+        webhook=WebhookConfig(
+            url=env("WEBHOOK_URL", None),
+            path=env("WEBHOOK_PATH", "/webhook"),
+            host=env("WEBHOOK_HOST", "0.0.0.0"),
+            port=env.int("WEBHOOK_PORT", 8080),
+            secret=env("WEBHOOK_SECRET", None),
+            max_concurrency=env.int("WEBHOOK_MAX_CONCURRENCY", 100),
+        ),
+        images=ImageStoreConfig(
+            type=env("IMAGE_STORE", "local"),
+            path=env("IMAGE_STORE_PATH", "img"),
+            url=env("S3_URL", None),
+            bucket=env("S3_BUCKET", None),
+            access_key=env("S3_ACCESS_KEY", None),
+            secret_key=env("S3_SECRET_KEY", None),
+            region=env("S3_REGION", "us-east-1"),
+            gc_grace=env.int("IMAGE_GC_GRACE", 3600),
+        ),
+        throttling=ThrottlingConfig(
+            rate=env.float("THROTTLE_RATE", 3.0),
+            burst=env.int("THROTTLE_BURST", 10),
+            answer_debounce=env.float("ANSWER_DEBOUNCE", 2.0),
+        ),
         pass_score=env.int("PASS_SCORE"),
         language=env("LANGUAGE"),
+        page_size=env.int("PAGE_SIZE", 10),
+        shuffle_questions=env.bool("SHUFFLE_QUESTIONS", False),
     )
 
 
@@ -2,13 +2,16 @@ MESSAGES = {
     "greeting admin": "Hello, admin!",
     "main menu": "Main menu",
     "tests": "List of tests",
+    "test unavailable": "This test is no longer available",
     "users": "List of users",
     "test statistics": (
         "\n\n<b>Statistics:</b>\n\n" "Success/Total: {completed}/{total}"
     ),
+    "score histogram": "\n\n<b>Scores:</b>\n",
+    "score histogram row": "\n{low}-{high}: {count}",
     "users statistics": (
         "<b>{user.name} {user.surname}</b>\n\n"
-        "Tests passed: {results['completed']}/{results['total']}"
+        "Tests passed: {results[completed]}/{results[total]}"
     ),
     "add test": "Enter test name",
     "add test description": "Enter test description",
@@ -39,6 +42,30 @@ MESSAGES = {
         "Test failed!\n" "Your score: {score} points.\n" "\nTry again."
     ),
     "test questions": 'Test\'s questions "{test_name}"',
+    "test analytics": '<b>Question analytics "{test_name}"</b>',
+    "test analytics empty": "\n\nNo results yet",
+    "question analytics": (
+        "\n\n<b>{number}. {text}</b>\n"
+        "{correct_rate} correct, discrimination {discrimination}"
+    ),
+    "answer analytics": "\n{mark} {text}: {count}",
+    "export results": "Exporting results: {exported}/{total}",
+    "export results done": "Results exported: {exported}",
+    "export results empty": "No results to export",
+    "import test": (
+        "Send a JSON, YAML or CSV file with the test, "
+        "or a zip archive with the file and images"
+    ),
+    "import test done": "Test {title} imported: {count} questions",
+    "import test failed": "Test not imported:\n\n{errors}",
+    "import bad file": "Unsupported or malformed file",
+    "import no title": "The test has no title",
+    "import no questions": "The test has no questions",
+    "import question text": "Question {number}: no text",
+    "import question answers": "Question {number}: at least two different answers needed",
+    "import question correct": "Question {number}: correct answer number is invalid",
+    "import question image": "Question {number}: image {image} not found",
+    "too many requests": "Too many requests, please slow down",
 }
 
 BUTTONS = {
@@ -58,12 +85,23 @@ BUTTONS = {
     "publish test": "Publish test",
     "delete test": "Delete test",
     "main menu": "Main menu",
+    "test analytics": "Question analytics",
+    "export results": "Export results",
+    "import test": "Import test",
+    "cancel": "Cancel",
+    "previous page": "⬅️",
+    "next page": "➡️",
 }
 
 LOGS = {
     # INFO
     "starting bot": "Starting bot",
     "stopping bot": "Stopping bot",
+    "migration applied": "Applied migration {version}: {description}",
+    "missing image": "Image {path} not found, question keeps old name",
+    "results flush failed": "Failed to save results, {depth} waiting in queue",
+    "result rejected": "Result rejected by the database: {result}",
+    "result lost": "Result not saved before shutdown: {result}",
     # DEBUG
     "greeting admin": "Admin: {admin_id} started bot",
     "main menu": "Admin: {admin_id} got to main menu",
@@ -72,6 +110,7 @@ LOGS = {
     "test": "Admin: {admin_id} got to test {test_id}",
     "question": "Admin: {admin_id} got to question {question_id}",
     "user": "Admin: {admin_id} got to user {user_id}",
+    "result": "Admin: {admin_id} got to result {result_id}",
     "add test": "Admin: {admin_id} started creating new test",
     "confirm delete test": "Admin: {admin_id} asked to delete test {test_id}",
     "delete test": "Admin: {admin_id} deleted test {test_id}",
@@ -83,4 +122,9 @@ LOGS = {
     "add test description": "Admin: {admin_id} is creating description {description} for test {title}",
     "add question": "Admin: {admin_id} started creating new question in test {test_id}",
     "test questions": "Admin: {admin_id} got to test {test_id} questions",
+    "test analytics": "Admin: {admin_id} got to test {test_id} analytics",
+    "results flushed": "Saved {count} results, {depth} waiting in queue",
+    "export results": "Admin: {admin_id} exported {count} results of test {test_id}",
+    "import test": "Admin: {admin_id} imported test {test_id} with {count} questions",
+    "throttled": "User: {user_id} sends updates too fast, update dropped",
 }
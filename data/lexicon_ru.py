@@ -2,14 +2,17 @@ MESSAGES = {
     "greeting admin": "Привет, админ!",
     "main menu": "Главное меню",
     "tests": "Список тестов",
+    "test unavailable": "Этот тест больше недоступен",
     "users": "Список пользователей",
     "test statistics": (
         "\n\n<b>Статистика:</b>\n\n"
-        "Успех/Всего: {statistics['completed']}/{statistics['total']}"
+        "Успех/Всего: {completed}/{total}"
     ),
+    "score histogram": "\n\n<b>Баллы:</b>\n",
+    "score histogram row": "\n{low}-{high}: {count}",
     "users statistics": (
         "<b>{user.name} {user.surname}</b>\n\n"
-        "Тестов пройдено: {results['completed']}/{results['total']}"
+        "Тестов пройдено: {results[completed]}/{results[total]}"
     ),
     "add test": "Введите название теста",
     "add test description": "Введите описание теста",
@@ -40,6 +43,30 @@ MESSAGES = {
         "Тест не пройдёт!\n" "Ваш результат: {score} баллов.\n" "\nПопробуйте еще раз."
     ),
     "test questions": 'Вопросы теста "{test_name}"',
+    "test analytics": '<b>Аналитика вопросов "{test_name}"</b>',
+    "test analytics empty": "\n\nРезультатов пока нет",
+    "question analytics": (
+        "\n\n<b>{number}. {text}</b>\n"
+        "Правильно: {correct_rate}, дискриминация: {discrimination}"
+    ),
+    "answer analytics": "\n{mark} {text}: {count}",
+    "export results": "Выгрузка результатов: {exported}/{total}",
+    "export results done": "Результатов выгружено: {exported}",
+    "export results empty": "Нет результатов для выгрузки",
+    "import test": (
+        "Отправьте файл JSON, YAML или CSV с тестом "
+        "или zip-архив с файлом и изображениями"
+    ),
+    "import test done": "Тест {title} импортирован, вопросов: {count}",
+    "import test failed": "Тест не импортирован:\n\n{errors}",
+    "import bad file": "Файл не поддерживается или поврежден",
+    "import no title": "У теста нет названия",
+    "import no questions": "В тесте нет вопросов",
+    "import question text": "Вопрос {number}: нет текста",
+    "import question answers": "Вопрос {number}: нужно не меньше двух разных ответов",
+    "import question correct": "Вопрос {number}: неверный номер правильного ответа",
+    "import question image": "Вопрос {number}: изображение {image} не найдено",
+    "too many requests": "Слишком много запросов, подождите немного",
 }
 
 BUTTONS = {
@@ -59,12 +86,23 @@ BUTTONS = {
     "publish test": "Опубликовать тест",
     "delete test": "Удалить тест",
     "main menu": "Главное меню",
+    "test analytics": "Аналитика вопросов",
+    "export results": "Выгрузить результаты",
+    "import test": "Импортировать тест",
+    "cancel": "Отмена",
+    "previous page": "⬅️",
+    "next page": "➡️",
 }
 
 LOGS = {
     # INFO
     "starting bot": "Запуск бота",
     "stopping bot": "Остановка бота",
+    "migration applied": "Применена миграция {version}: {description}",
+    "missing image": "Изображение {path} не найдено, у вопроса осталось старое имя",
+    "results flush failed": "Не удалось сохранить результаты, в очереди {depth}",
+    "result rejected": "База данных отклонила результат: {result}",
+    "result lost": "Результат не сохранен до остановки: {result}",
     # DEBUG
     "greeting admin": "Админ: {admin_id} запустил бота",
     "main menu": "Админ: {admin_id} перешел в главное меню",
@@ -73,6 +111,7 @@ LOGS = {
     "test": "Админ: {admin_id} перешел в тест {test_id}",
     "question": "Админ: {admin_id} перешел в вопрос {question_id}",
     "user": "Админ: {admin_id} перешел в пользователь {user_id}",
+    "result": "Админ: {admin_id} перешел в результат {result_id}",
     "add test": "Админ: {admin_id} начал создание нового теста",
     "confirm delete test": "Админ: {admin_id} запросил удалить этот тест {test_id}",
     "delete test": "Админ: {admin_id} удалил тест {test_id}",
@@ -84,4 +123,9 @@ LOGS = {
     "add test description": "Админ: {admin_id} создает описание {description} для теста {title}",
     "add question": "Админ: {admin_id} начал создание нового вопроса в тесте {test_id}",
     "test questions": "Админ: {admin_id} перешел в вопросы теста {test_id}",
+    "test analytics": "Админ: {admin_id} перешел в аналитику теста {test_id}",
+    "results flushed": "Сохранено результатов: {count}, в очереди {depth}",
+    "export results": "Админ: {admin_id} выгрузил {count} результатов теста {test_id}",
+    "import test": "Админ: {admin_id} импортировал тест {test_id}, вопросов: {count}",
+    "throttled": "Пользователь: {user_id} слишком часто отправляет запросы, запрос отброшен",
 }
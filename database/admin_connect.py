@@ -8,8 +8,10 @@
 Функции для работы с тестами:
     create_test
         Создание теста
+    import_test
+        Создание теста с вопросами и ответами в одной транзакции
     get_tests
-        Получение всех тестов
+        Получение страницы тестов
     get_test_by_id
         Получение теста по id
     delete_test_by_id
@@ -18,10 +20,10 @@
         Публикация теста по id
     get_test_by_question_id
         Получение теста по id вопроса
-    get_test_id_by_question_id
-        Получение id теста по id вопроса
     get_statistics_by_test_id
         Получение статистики по id теста
+    get_question_analytics
+        Получение аналитики вопросов по id теста
 
 Функции для работы с вопросами:
     create_question
@@ -29,32 +31,53 @@
     get_question_by_id
         Получение вопроса по id
     get_questions_by_test_id
-        Получение вопросов по id теста
+        Получение страницы вопросов по id теста
+    get_count_questions_by_test_id
+        Получение количества вопросов по id теста
     delete_question_by_id
         Удаление вопроса по id
     change_correct_answer
         Изменение правильного ответа
 
+Функции для работы с изображениями:
+    get_image_keys
+        Получение ключей изображений, на которые ссылаются вопросы
+
 Функции для работы с пользователями:
     get_users
-        Получение всех пользователей
+        Получение страницы пользователей
     get_user_by_id
         Получение пользователя по id
 
 Функции работы с результатами:
     get_count_results_by_user_id
         Получение количество результатов пользователя
+    get_count_results_by_users
+        Получение количества пройденных тестов пользователей
+    get_count_tests
+        Получение количества тестов
     get_results_by_user_id
-        Получение результатов пользователя
+        Получение страницы результатов пользователя с названиями тестов
     get_result_by_id
         Получение результата по id
     get_result_data_by_result
         Получение данных результата
+    stream_results_by_test_id
+        Потоковое получение результатов теста пачками
+
+Классы:
+    ExportedResult
+        Результат теста для выгрузки
 """
 
-from sqlalchemy.orm import sessionmaker, aliased
+from typing import AsyncIterator, NamedTuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, load_only
 
-from config import config
+from database.analytics import QuestionAnalytics, analytics_cache
+from database.cache import test_cache
 from database.database import (
     Answer,
     IncorrectAnswer,
@@ -62,212 +85,398 @@ from database.database import (
     Result,
     User,
     Test,
-    engine,
+    TestScoreBucket,
+    TestStatistics,
+    UserStatistics,
+    Session,
 )
-
-Session = sessionmaker(engine)
+from database.pagination import Page, paginate
+from database.result_queue import result_queue
+from database.statistics import (
+    BUCKETS,
+    rebuild_test_statistics,
+    rebuild_user_statistics,
+)
+from database.user_connect import get_test_snapshot
 
 
-def create_test(title: str, description: str) -> None:
-    """Create test."""
-    with Session() as session:
+async def create_test(title: str, description: str) -> int:
+    """Create test and return its id."""
+    async with Session() as session:
         test = Test(
             title=title,
             description=description,
         )
         session.add(test)
-        session.commit()
+        await session.commit()
+        return test.id
+
+
+async def import_test(
+    title: str,
+    description: str,
+    questions: list[tuple[str, dict[str, bool], str | None]],
+) -> int:
+    """Create test with questions (text, answers, image) in one transaction."""
+    async with Session() as session:
+        test_id = await session.scalar(
+            insert(Test)
+            .values(title=title, description=description)
+            .returning(Test.id)
+        )
+        question_ids = await session.scalars(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            [
+                {"test_id": test_id, "text": text, "image": image}
+                for text, _, image in questions
+            ],
+        )
+        await session.execute(
+            insert(Answer),
+            [
+                {"question_id": question_id, "text": text, "is_correct": is_correct}
+                for question_id, (_, answers, _) in zip(question_ids, questions)
+                for text, is_correct in answers.items()
+            ],
+        )
+        await session.commit()
+        return test_id
 
 
-def get_tests() -> list[Test]:
-    with Session() as session:
-        tests = session.query(Test).order_by(Test.id.desc()).all()
-        return tests
+async def get_tests(
+    after: int | None = None, before: int | None = None
+) -> Page[Test]:
+    """Get page of tests, newest first."""
+    async with Session() as session:
+        return await paginate(
+            session,
+            select(Test).options(
+                load_only(Test.id, Test.title, Test.is_publish, raiseload=True)
+            ),
+            Test.id,
+            after,
+            before,
+            descending=True,
+        )
 
 
-def get_test_by_id(test_id: int) -> Test:
+async def get_test_by_id(test_id: int) -> Test:
     """Get test by id."""
-    with Session() as session:
-        test = session.query(Test).filter(Test.id == test_id).one()
-        return test
-
-
-def delete_test_by_id(test_id: int) -> None:
-    """Delete test by id."""
-    with Session() as session:
-        session.query(IncorrectAnswer).filter(
-            IncorrectAnswer.result.has(test_id=test_id)
-        ).delete()
-        session.query(Result).filter(Result.test_id == test_id).delete()
-        session.query(Answer).filter(Answer.question.has(test_id=test_id)).delete()
-        session.query(Question).filter(Question.test_id == test_id).delete()
-        session.query(Test).filter(Test.id == test_id).delete()
-        session.commit()
+    async with Session() as session:
+        test = await session.scalars(select(Test).where(Test.id == test_id))
+        return test.one()
+
+
+async def delete_test_by_id(test_id: int) -> list[str]:
+    """Delete test by id and return keys of images left without questions."""
+    result_queue.discard(test_id)
+    async with Session() as session:
+        images = await session.scalars(
+            select(Question.image)
+            .where(Question.test_id == test_id, Question.image.is_not(None))
+            .distinct()
+        )
+        images = images.all()
+        user_ids = await session.scalars(
+            select(Result.user_id).where(Result.test_id == test_id).distinct()
+        )
+        user_ids = user_ids.all()
+        await session.execute(
+            delete(IncorrectAnswer).where(
+                IncorrectAnswer.result_id.in_(
+                    select(Result.id).where(Result.test_id == test_id)
+                )
+            )
+        )
+        await session.execute(delete(Result).where(Result.test_id == test_id))
+        await rebuild_test_statistics(session, [test_id])
+        await rebuild_user_statistics(session, user_ids)
+        await session.execute(
+            delete(Answer).where(
+                Answer.question_id.in_(
+                    select(Question.id).where(Question.test_id == test_id)
+                )
+            )
+        )
+        await session.execute(delete(Question).where(Question.test_id == test_id))
+        await session.execute(delete(Test).where(Test.id == test_id))
+        unreferenced = await _get_unreferenced_images(session, images)
+        await session.commit()
+    test_cache.invalidate(test_id)
+    analytics_cache.invalidate(test_id)
+    return unreferenced
 
 
-def publish_test_by_id(test_id: int) -> None:
+async def publish_test_by_id(test_id: int) -> None:
     """Publish test by id."""
-    with Session() as session:
-        session.query(Test).filter(Test.id == test_id).update({"is_publish": True})
-        session.commit()
+    async with Session() as session:
+        await session.execute(
+            update(Test).where(Test.id == test_id).values(is_publish=True)
+        )
+        await session.commit()
+    test_cache.invalidate(test_id)
 
 
-def get_test_by_question_id(question_id: int) -> Test:
+async def get_test_by_question_id(question_id: int) -> Test:
     """Get test by question id."""
-    with Session() as session:
-        test = (
-            session.query(Test)
-            .filter(Test.id == get_test_id_by_question_id(question_id))
-            .one()
+    async with Session() as session:
+        test = await session.scalars(
+            select(Test).where(
+                Test.id
+                == select(Question.test_id)
+                .where(Question.id == question_id)
+                .scalar_subquery()
+            )
         )
-        return test
+        return test.one()
 
 
-def get_test_id_by_question_id(question_id: int) -> int:
-    """Get test id by question id."""
-    with Session() as session:
-        test_id = (
-            session.query(Question).filter(Question.id == question_id).one().test_id
+async def get_statistics_by_test_id(test_id: int) -> dict[str, int | list[int]]:
+    """Get passes, attempts and score histogram by test id."""
+    async with Session() as session:
+        statistics = await session.get(TestStatistics, test_id)
+        buckets = await session.execute(
+            select(TestScoreBucket.bucket, TestScoreBucket.count).where(
+                TestScoreBucket.test_id == test_id
+            )
         )
-        return test_id
-
 
-def get_statistics_by_test_id(test_id: int) -> dict[str, int]:
-    """Get statistics by test id."""
-    with Session() as session:
-        results = session.query(Result).filter(Result.test_id == test_id)
+        histogram = [0] * BUCKETS
+        for bucket, count in buckets.tuples():
+            histogram[bucket] = count
 
-        total = results.count()
-        completed = results.filter(Result.score >= config.pass_score).count()
-
-        statistics = {
-            "completed": completed,
-            "total": total,
+        return {
+            "completed": statistics.passes if statistics else 0,
+            "total": statistics.attempts if statistics else 0,
+            "histogram": histogram,
         }
 
-        return statistics
+
+async def get_question_analytics(test_id: int) -> list[QuestionAnalytics]:
+    """Get correct rate, discrimination and answer picks of test questions."""
+    return await analytics_cache.get(await get_test_snapshot(test_id))
 
 
-def create_question(
-    test_id: int, text: str, answers: dict[str, bool], image: str | None = None
+async def create_question(
+    test_id: int,
+    text: str,
+    answers: dict[str, bool],
+    image: str | None = None,
+    file_id: str | None = None,
 ) -> None:
     """Create question."""
-    with Session() as session:
-        question = Question(test_id=test_id, text=text, image=image)
-
-        session.add(question)
-        session.commit()
-
-        answer_objs = [
-            Answer(
-                question_id=question.id,
-                text=text,
-                is_correct=is_correct,
-            )
-            for text, is_correct in answers.items()
-        ]
+    async with Session() as session:
+        question_id = await session.scalar(
+            insert(Question)
+            .values(test_id=test_id, text=text, image=image, file_id=file_id)
+            .returning(Question.id)
+        )
 
-        session.add_all(answer_objs)
-        session.commit()
+        await session.execute(
+            insert(Answer),
+            [
+                {
+                    "question_id": question_id,
+                    "text": text,
+                    "is_correct": is_correct,
+                }
+                for text, is_correct in answers.items()
+            ],
+        )
+        await session.commit()
+    test_cache.invalidate(test_id)
 
 
-def get_question_by_id(
+async def get_question_by_id(
     question_id: int,
 ) -> tuple[Question, list[Answer]]:
     """Get question and answers by question id."""
-    with Session() as session:
-        question = session.query(Question).filter(Question.id == question_id).one()
-        answers = session.query(Answer).filter(Answer.question_id == question.id).all()
-        return question, answers
+    async with Session() as session:
+        question = await session.scalars(
+            select(Question).where(Question.id == question_id)
+        )
+        question = question.one()
+        answers = await session.scalars(
+            select(Answer).where(Answer.question_id == question.id)
+        )
+        return question, list(answers)
+
+
+async def get_questions_by_test_id(
+    test_id: int, after: int | None = None, before: int | None = None
+) -> Page[Question]:
+    """Get page of questions by test id."""
+    async with Session() as session:
+        return await paginate(
+            session,
+            select(Question)
+            .options(load_only(Question.id, Question.text, raiseload=True))
+            .where(Question.test_id == test_id),
+            Question.id,
+            after,
+            before,
+        )
 
 
-def get_questions_by_test_id(test_id: int) -> list[Question]:
-    """Get questions by test id."""
-    with Session() as session:
-        questions = session.query(Question).filter(Question.test_id == test_id).all()
-        return questions
+async def get_count_questions_by_test_id(test_id: int) -> int:
+    """Get count of questions by test id."""
+    async with Session() as session:
+        return await session.scalar(
+            select(func.count(Question.id)).where(Question.test_id == test_id)
+        )
 
 
-def delete_question_by_id(question_id: int) -> None:
-    """Delete question by id."""
-    with Session() as session:
-        session.query(Answer).filter(Answer.question_id == question_id).delete()
-        session.query(Question).filter(Question.id == question_id).delete()
-        session.commit()
+async def delete_question_by_id(question_id: int) -> list[str]:
+    """Delete question by id and return keys of images left without questions."""
+    async with Session() as session:
+        test_id, image = (
+            await session.execute(
+                select(Question.test_id, Question.image).where(
+                    Question.id == question_id
+                )
+            )
+        ).one()
+        await session.execute(delete(Answer).where(Answer.question_id == question_id))
+        await session.execute(delete(Question).where(Question.id == question_id))
+        unreferenced = await _get_unreferenced_images(
+            session, [image] if image else []
+        )
+        await session.commit()
+    test_cache.invalidate(test_id)
+    return unreferenced
 
 
-def change_correct_answer(
+async def change_correct_answer(
     question_id: int,
     answer_id: int,
 ) -> None:
     """Change correct answer."""
-    with Session() as session:
-        session.query(Answer).filter(Answer.question_id == question_id).update(
-            {"is_correct": False}
+    async with Session() as session:
+        test_id = await session.scalar(
+            select(Question.test_id).where(Question.id == question_id)
         )
-        session.query(Answer).filter(Answer.id == answer_id).update(
-            {"is_correct": True}
+        await session.execute(
+            update(Answer)
+            .where(Answer.question_id == question_id)
+            .values(is_correct=False)
+        )
+        await session.execute(
+            update(Answer).where(Answer.id == answer_id).values(is_correct=True)
+        )
+        await session.commit()
+    test_cache.invalidate(test_id)
+
+
+async def _get_unreferenced_images(
+    session: AsyncSession, images: list[str]
+) -> list[str]:
+    """Get keys of images no question refers to."""
+    if not images:
+        return []
+    referenced = await session.scalars(
+        select(Question.image).where(Question.image.in_(images)).distinct()
+    )
+    return sorted(set(images) - set(referenced))
+
+
+async def get_image_keys(keys: list[str] | None = None) -> set[str]:
+    """Get keys of images questions refer to, only of the given keys if set."""
+    condition = (
+        Question.image.is_not(None) if keys is None else Question.image.in_(keys)
+    )
+    async with Session() as session:
+        images = await session.scalars(
+            select(Question.image).where(condition).distinct()
+        )
+        return set(images)
+
+
+async def get_users(
+    after: int | None = None, before: int | None = None
+) -> Page[User]:
+    """Get page of users."""
+    async with Session() as session:
+        return await paginate(
+            session,
+            select(User).options(
+                load_only(User.id, User.name, User.surname, raiseload=True)
+            ),
+            User.id,
+            after,
+            before,
         )
-        session.commit()
-
-
-def get_users() -> list[User]:
-    """Get all users."""
-    with Session() as session:
-        users = session.query(User).all()
-        return users
 
 
-def get_user_by_id(user_id: int) -> User:
+async def get_user_by_id(user_id: int) -> User:
     """Get user by id."""
-    with Session() as session:
-        user = session.query(User).filter(User.id == user_id).one()
-        return user
+    async with Session() as session:
+        user = await session.scalars(select(User).where(User.id == user_id))
+        return user.one()
 
 
-def get_count_results_by_user_id(user_id: int) -> dict[str, int]:
+async def get_count_results_by_user_id(user_id: int) -> dict[str, int]:
     """Get dictionary of completed and total tests for user."""
-    with Session() as session:
-        total_tests = session.query(Test).count()
-        completed_tests = (
-            session.query(Result)
-            .filter(Result.user_id == user_id)
-            .group_by(Result.test_id)
-            .filter(Result.score >= config.pass_score)
-            .count()
+    async with Session() as session:
+        total_tests = await session.scalar(select(func.count(Test.id)))
+        completed_tests = await session.scalar(
+            select(UserStatistics.passed_tests).where(
+                UserStatistics.user_id == user_id
+            )
         )
-        return {"completed": completed_tests, "total": total_tests}
+        return {"completed": completed_tests or 0, "total": total_tests}
 
 
-def get_results_by_user_id(user_id: int) -> list[Result]:
-    """Get list of results for user."""
-    with Session() as session:
-        results = (
-            session.query(Result)
-            .filter(Result.user_id == user_id)
-            .order_by(Result.id.desc())
-            .all()
+async def get_count_results_by_users(user_ids: list[int]) -> dict[int, int]:
+    """Get dictionary of completed tests count by user id."""
+    async with Session() as session:
+        rows = await session.execute(
+            select(UserStatistics.user_id, UserStatistics.passed_tests).where(
+                UserStatistics.user_id.in_(user_ids)
+            )
+        )
+        return dict(rows.tuples().all())
+
+
+async def get_count_tests() -> int:
+    """Get count of tests."""
+    async with Session() as session:
+        return await session.scalar(select(func.count(Test.id)))
+
+
+async def get_results_by_user_id(
+    user_id: int, after: int | None = None, before: int | None = None
+) -> Page[tuple[int, int, str]]:
+    """Get page of result id, score and test title for user, newest first."""
+    async with Session() as session:
+        return await paginate(
+            session,
+            select(Result.id, Result.score, Test.title)
+            .join(Test, Test.id == Result.test_id)
+            .where(Result.user_id == user_id),
+            Result.id,
+            after,
+            before,
+            descending=True,
         )
-        return results
 
 
-def get_result_by_id(result_id: int) -> Result:
+async def get_result_by_id(result_id: int) -> Result:
     """Get result by id."""
-    with Session() as session:
-        result = session.query(Result).filter(Result.id == result_id).one()
-        return result
+    async with Session() as session:
+        result = await session.scalars(select(Result).where(Result.id == result_id))
+        return result.one()
 
 
-def get_result_data_by_result(result: Result) -> list[tuple[str, str, str]]:
+async def get_result_data_by_result(result: Result) -> list[tuple[str, str, str]]:
     """Get data of result."""
-    with Session() as session:
+    async with Session() as session:
         q = aliased(Question)
         ia = aliased(IncorrectAnswer)
         a_user = aliased(Answer)
         a_correct = aliased(Answer)
 
-        data = (
-            session.query(
+        data = await session.execute(
+            select(
                 q.text,
                 a_correct.text,
                 a_user.text,
@@ -275,8 +484,64 @@ def get_result_data_by_result(result: Result) -> list[tuple[str, str, str]]:
             .join(ia, ia.question_id == q.id)
             .join(a_user, a_user.id == ia.answer_id)
             .join(a_correct, a_correct.question_id == q.id)
-            .filter(a_correct.is_correct, Result.id == result.id)
-            .filter(ia.result_id == result.id)
-            .all()
+            .where(a_correct.is_correct)
+            .where(ia.result_id == result.id)
+        )
+        return list(data.all())
+
+
+class ExportedResult(NamedTuple):
+    """Result of test with user name and incorrect answers for export."""
+
+    result_id: int
+    name: str
+    surname: str
+    score: int
+    incorrect_answers: list[tuple[str, str]]
+
+
+async def stream_results_by_test_id(
+    test_id: int, chunk_size: int = 1000
+) -> AsyncIterator[list[ExportedResult]]:
+    """
+    Stream results of test in chunks from a server-side cursor.
+
+    Incorrect answers are joined to results and grouped back by result id,
+    so at most one chunk of rows is held in memory.
+    """
+    statement = (
+        select(
+            Result.id,
+            User.name,
+            User.surname,
+            Result.score,
+            Question.text,
+            Answer.text,
         )
-        return data
+        .join(User, User.id == Result.user_id)
+        .outerjoin(IncorrectAnswer, IncorrectAnswer.result_id == Result.id)
+        .outerjoin(Question, Question.id == IncorrectAnswer.question_id)
+        .outerjoin(Answer, Answer.id == IncorrectAnswer.answer_id)
+        .where(Result.test_id == test_id)
+        .order_by(Result.id, IncorrectAnswer.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async with Session() as session:
+        rows = await session.stream(statement)
+        chunk: list[ExportedResult] = []
+        current: ExportedResult | None = None
+        async for partition in rows.partitions():
+            for result_id, name, surname, score, question, answer in partition:
+                if current is None or current.result_id != result_id:
+                    if current is not None:
+                        chunk.append(current)
+                    current = ExportedResult(result_id, name, surname, score, [])
+                if question is not None:
+                    current.incorrect_answers.append((question, answer))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if current is not None:
+            chunk.append(current)
+        if chunk:
+            yield chunk
@@ -0,0 +1,247 @@
+"""
+Модуль аналитики вопросов.
+
+Для каждого вопроса теста считаются доля правильных ответов, индекс
+дискриминации (точечно-бисериальная корреляция правильности ответа с
+результатом теста) и частота выбора каждого ответа.
+
+Аналитика строится из сумм по результатам теста: количества результатов,
+суммы и суммы квадратов баллов, а для каждого неправильного ответа -
+количества выборов и суммы баллов выбравших его. Суммы загружаются
+запросами с группировкой и хранятся в памяти процесса, а при каждом
+обращении к ним добавляются результаты, сохраненные после последней
+загрузки, в том числе другими процессами бота. Раз в ANALYTICS_TTL секунд
+суммы загружаются заново. Вопрос, для которого в результате нет
+неправильного ответа, считается отвеченным правильно: вопросы нельзя
+изменить после публикации теста.
+
+Классы:
+    QuestionAnalytics - аналитика вопроса.
+    AnalyticsCache - кэш сумм для аналитики вопросов.
+
+Объекты:
+    analytics_cache - общий экземпляр кэша.
+"""
+
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, select
+
+from config import config
+from database.cache import test_cache
+from database.database import IncorrectAnswer, Result, Session
+from database.snapshot import TestSnapshot
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionAnalytics:
+    """
+    Аналитика вопроса.
+
+    question_id: int - id вопроса.
+    text: str - текст вопроса.
+    correct_rate: float | None - доля правильных ответов.
+    discrimination: float | None - индекс дискриминации.
+    picks: tuple[tuple[str, bool, int], ...] - текст ответа, является ли он
+        правильным и количество выборов.
+    """
+
+    question_id: int
+    text: str
+    correct_rate: float | None
+    discrimination: float | None
+    picks: tuple[tuple[str, bool, int], ...]
+
+
+@dataclass(slots=True)
+class _Totals:
+    version: int = 0
+    # Время monotonic, после которого суммы загружаются заново
+    expires: float = 0.0
+    last_result_id: int = 0
+    results: int = 0
+    score_sum: int = 0
+    score_squares: int = 0
+    # id вопроса -> количество неправильных ответов и сумма баллов
+    incorrect: dict[int, list[int]] = field(
+        default_factory=lambda: defaultdict(lambda: [0, 0])
+    )
+    # id ответа -> количество выборов
+    picks: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+    def merge(self, other: "_Totals") -> None:
+        self.results += other.results
+        self.score_sum += other.score_sum
+        self.score_squares += other.score_squares
+        for question_id, (count, score_sum) in other.incorrect.items():
+            self.incorrect[question_id][0] += count
+            self.incorrect[question_id][1] += score_sum
+        for answer_id, count in other.picks.items():
+            self.picks[answer_id] += count
+        self.last_result_id = other.last_result_id
+
+
+async def _load_totals(test_id: int, after: int) -> _Totals:
+    """Загрузка сумм по результатам теста с id больше after."""
+    async with Session() as session:
+        last_result_id = await session.scalar(
+            select(func.max(Result.id)).where(
+                (Result.test_id == test_id) & (Result.id > after)
+            )
+        )
+        totals = _Totals(last_result_id=last_result_id or after)
+        if last_result_id is None:
+            return totals
+        condition = (
+            (Result.test_id == test_id)
+            & (Result.id > after)
+            & (Result.id <= last_result_id)
+        )
+
+        row = await session.execute(
+            select(
+                func.count(Result.id),
+                func.coalesce(func.sum(Result.score), 0),
+                func.coalesce(func.sum(Result.score * Result.score), 0),
+            ).where(condition)
+        )
+        totals.results, totals.score_sum, totals.score_squares = row.one()
+
+        rows = await session.execute(
+            select(
+                IncorrectAnswer.question_id,
+                IncorrectAnswer.answer_id,
+                func.count(IncorrectAnswer.id),
+                func.sum(Result.score),
+            )
+            .join(Result, Result.id == IncorrectAnswer.result_id)
+            .where(condition)
+            .group_by(IncorrectAnswer.question_id, IncorrectAnswer.answer_id)
+        )
+        for question_id, answer_id, count, score_sum in rows.tuples():
+            totals.incorrect[question_id][0] += count
+            totals.incorrect[question_id][1] += score_sum
+            totals.picks[answer_id] += count
+
+    return totals
+
+
+def _discrimination(
+    totals: _Totals, incorrect: int, incorrect_sum: int
+) -> float | None:
+    correct = totals.results - incorrect
+    if not correct or not incorrect:
+        return None
+    mean = totals.score_sum / totals.results
+    variance = totals.score_squares / totals.results - mean * mean
+    if variance <= 0:
+        return None
+    correct_mean = (totals.score_sum - incorrect_sum) / correct
+    incorrect_mean = incorrect_sum / incorrect
+    share = correct / totals.results
+    return (
+        (correct_mean - incorrect_mean)
+        / math.sqrt(variance)
+        * math.sqrt(share * (1 - share))
+    )
+
+
+class AnalyticsCache:
+    """
+    Кэш сумм для аналитики вопросов.
+
+    Суммы теста загружаются заново при изменении версии теста в кэше
+    тестов и по истечении ttl. Каждая сумма помнит id последнего учтенного
+    результата, и при обращении к ней загружаются только более новые
+    результаты, поэтому результат не учитывается дважды.
+
+    ttl: float - время жизни сумм в секундах.
+    hits: int - количество обращений без полной загрузки сумм.
+    misses: int - количество полных загрузок сумм.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._totals: dict[int, _Totals] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, snapshot: TestSnapshot) -> list[QuestionAnalytics]:
+        """
+        Получение аналитики вопросов теста.
+
+        Args:
+            snapshot:
+                Снимок теста.
+
+        Returns:
+            Аналитика вопросов в порядке вопросов теста.
+        """
+        version = test_cache.version(snapshot.id)
+        totals = self._totals.get(snapshot.id)
+        if (
+            totals is not None
+            and totals.version == version
+            and totals.expires > time.monotonic()
+        ):
+            self.hits += 1
+        else:
+            self.misses += 1
+            totals = _Totals(version=version, expires=time.monotonic() + self.ttl)
+        last_result_id = totals.last_result_id
+        new = await _load_totals(snapshot.id, after=last_result_id)
+        # Одновременное обращение могло уже добавить эти результаты
+        if totals.last_result_id == last_result_id:
+            totals.merge(new)
+        if test_cache.version(snapshot.id) == version:
+            self._totals[snapshot.id] = totals
+
+        analytics = []
+        for question in snapshot.questions:
+            incorrect, incorrect_sum = totals.incorrect.get(question.id, (0, 0))
+            correct = totals.results - incorrect
+            analytics.append(
+                QuestionAnalytics(
+                    question_id=question.id,
+                    text=question.text,
+                    correct_rate=(
+                        correct / totals.results if totals.results else None
+                    ),
+                    discrimination=_discrimination(totals, incorrect, incorrect_sum),
+                    picks=tuple(
+                        (
+                            answer.text,
+                            answer.is_correct,
+                            correct
+                            if answer.is_correct
+                            else totals.picks.get(answer.id, 0),
+                        )
+                        for answer in question.answers
+                    ),
+                )
+            )
+        return analytics
+
+    def invalidate(self, test_id: int) -> None:
+        """
+        Сброс сумм теста.
+
+        Args:
+            test_id:
+                Идентификатор теста.
+        """
+        self._totals.pop(test_id, None)
+
+    def stats(self) -> dict[str, int]:
+        """Получение статистики кэша."""
+        return {
+            "size": len(self._totals),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+analytics_cache = AnalyticsCache(ttl=config.database.analytics_ttl)
@@ -0,0 +1,142 @@
+"""
+Модуль кэша тестов.
+
+Хранит снимки тестов в памяти процесса, чтобы пользователи, проходящие
+один и тот же тест, не обращались к базе данных. Снимок загружается при
+первом обращении и сбрасывается при изменении теста администратором.
+
+Классы:
+    TestCache - версионируемый кэш снимков тестов.
+
+Объекты:
+    test_cache - общий экземпляр кэша.
+"""
+
+import asyncio
+from dataclasses import replace
+from typing import Awaitable, Callable
+
+from database.snapshot import TestSnapshot
+
+Loader = Callable[[int], Awaitable[TestSnapshot]]
+
+
+class TestCache:
+    """
+    Версионируемый кэш снимков тестов.
+
+    Каждое изменение теста увеличивает его версию, поэтому снимок,
+    загруженный до изменения, не попадет в кэш. Снимок хранит версию,
+    с которой он загружен.
+
+    hits: int - количество обращений без загрузки из базы данных.
+    misses: int - количество загрузок из базы данных.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: dict[int, TestSnapshot] = {}
+        self._versions: dict[int, int] = {}
+        self._loading: dict[int, asyncio.Future[TestSnapshot]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, test_id: int) -> int:
+        """
+        Получение версии теста.
+
+        Args:
+            test_id:
+                Идентификатор теста.
+
+        Returns:
+            Версия теста.
+        """
+        return self._versions.get(test_id, 0)
+
+    async def get(self, test_id: int, loader: Loader) -> TestSnapshot:
+        """
+        Получение снимка теста.
+
+        Одновременные промахи по одному тесту ожидают одну загрузку.
+
+        Args:
+            test_id:
+                Идентификатор теста.
+            loader:
+                Функция загрузки снимка из базы данных.
+
+        Returns:
+            Снимок теста.
+        """
+        snapshot = self._snapshots.get(test_id)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        loading = self._loading.get(test_id)
+        if loading is not None:
+            self.hits += 1
+            return await asyncio.shield(loading)
+
+        self.misses += 1
+        version = self.version(test_id)
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[test_id] = loading
+        try:
+            snapshot = replace(await loader(test_id), version=version)
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except Exception as error:
+            loading.set_exception(error)
+            loading.exception()
+            raise
+        else:
+            loading.set_result(snapshot)
+            if self.version(test_id) == version:
+                self._snapshots[test_id] = snapshot
+            return snapshot
+        finally:
+            if self._loading.get(test_id) is loading:
+                del self._loading[test_id]
+
+    def update(
+        self, test_id: int, function: Callable[[TestSnapshot], TestSnapshot]
+    ) -> None:
+        """
+        Замена снимка теста без изменения версии.
+
+        Используется для изменений, не влияющих на содержание теста.
+
+        Args:
+            test_id:
+                Идентификатор теста.
+            function:
+                Функция, возвращающая новый снимок по текущему.
+        """
+        snapshot = self._snapshots.get(test_id)
+        if snapshot is not None:
+            self._snapshots[test_id] = function(snapshot)
+
+    def invalidate(self, test_id: int) -> None:
+        """
+        Сброс снимка теста.
+
+        Args:
+            test_id:
+                Идентификатор теста.
+        """
+        self._versions[test_id] = self.version(test_id) + 1
+        self._snapshots.pop(test_id, None)
+        self._loading.pop(test_id, None)
+
+    def stats(self) -> dict[str, int]:
+        """Получение статистики кэша."""
+        return {
+            "size": len(self._snapshots),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+test_cache = TestCache()
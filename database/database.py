@@ -3,6 +3,9 @@
 
 Содержит в себе модели таблиц и функции для работы с ними.
 
+Связи моделей не загружаются по умолчанию (lazy="raise"): каждый запрос
+сам указывает, какие данные ему нужны.
+
 Модели таблиц:
     User - модель пользователя.
     Test - модель теста.
@@ -10,19 +13,60 @@
     Answer - модель ответа.
     Result - модель результата.
     IncorrectAnswer - модель неправильного ответа.
+    TestStatistics - модель статистики теста.
+    TestScoreBucket - модель корзины гистограммы результатов теста.
+    UserStatistics - модель статистики пользователя.
+    FSMRecord - модель записи хранилища FSM.
+
+Функции:
+    create_tables - создание таблиц.
+    insert - конструкция INSERT с поддержкой ON CONFLICT для текущей базы.
 """
 
-from sqlalchemy import BigInteger, ForeignKey, create_engine
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, ForeignKey, Index, Insert, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import (
     Mapped,
     declarative_base,
     mapped_column,
     relationship,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import config
 
-engine = create_engine(config.database.url)
+database_url = make_url(config.database.url)
+engine = create_async_engine(
+    database_url,
+    # Для файла SQLite по умолчанию каждая сессия открывает свое соединение,
+    # и при нагрузке сотни соединений ждут блокировку записи, пока не
+    # истечет время ожидания. Пул ограничивает их число, а остальные
+    # сессии ждут свободное соединение в очереди.
+    poolclass=(
+        AsyncAdaptedQueuePool
+        if database_url.get_backend_name() == "sqlite"
+        and database_url.database not in (None, "", ":memory:")
+        else None
+    ),
+)
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(connection, _) -> None:
+        # WAL: читатели не блокируют запись, а фиксация транзакции не ждет
+        # синхронизации журнала с диском
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+# Фабрика асинхронных сессий
+Session = async_sessionmaker(engine, expire_on_commit=False)
 
 # Базовая модель
 Base = declarative_base()
@@ -45,7 +89,7 @@ class User(Base):
     name: Mapped[str] = mapped_column(nullable=False)
     surname: Mapped[str] = mapped_column(nullable=False)
     results: Mapped[list["Result"]] = relationship(
-        back_populates="user", uselist=True, lazy="joined"
+        back_populates="user", uselist=True, lazy="raise"
     )
 
 
@@ -66,10 +110,10 @@ class Test(Base):
     title: Mapped[str] = mapped_column(nullable=False)
     description: Mapped[str] = mapped_column(nullable=False)
     questions: Mapped[list["Question"]] = relationship(
-        back_populates="test", uselist=True, lazy="joined"
+        back_populates="test", uselist=True, lazy="raise"
     )
     results: Mapped[list["Result"]] = relationship(
-        back_populates="test", uselist=True, lazy="joined"
+        back_populates="test", uselist=True, lazy="raise"
     )
     is_publish: Mapped[bool] = mapped_column(nullable=False, default=False)
 
@@ -82,21 +126,26 @@ class Question(Base):
     test: Test - тест, к которому относится вопрос.
     text: str - текст вопроса.
     image: str - изображение вопроса.
+    file_id: str - id файла изображения в Telegram.
     answers: list[Answer] - ответы на вопрос.
     incorrect_answers: list[IncorrectAnswer] - неправильные ответы на вопрос.
     """
 
     __tablename__ = "questions"
+    __table_args__ = (Index("ix_questions_test_id", "test_id"),)
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    test: Mapped["Test"] = relationship(back_populates="questions", uselist=False)
+    test: Mapped["Test"] = relationship(
+        back_populates="questions", uselist=False, lazy="raise"
+    )
     test_id = mapped_column(ForeignKey("tests.id"), nullable=False)
     text: Mapped[str] = mapped_column(nullable=False)
     image: Mapped[str] = mapped_column(nullable=True)
+    file_id: Mapped[str] = mapped_column(nullable=True)
     answers: Mapped[list["Answer"]] = relationship(
-        back_populates="question", uselist=True, lazy="joined"
+        back_populates="question", uselist=True, lazy="raise"
     )
     incorrect_answers: Mapped[list["IncorrectAnswer"]] = relationship(
-        back_populates="question", uselist=True, lazy="joined"
+        back_populates="question", uselist=True, lazy="raise"
     )
 
 
@@ -112,13 +161,18 @@ class Answer(Base):
     """
 
     __tablename__ = "answers"
+    __table_args__ = (
+        Index("ix_answers_question_id_is_correct", "question_id", "is_correct"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    question: Mapped["Question"] = relationship(back_populates="answers", uselist=False)
+    question: Mapped["Question"] = relationship(
+        back_populates="answers", uselist=False, lazy="raise"
+    )
     question_id = mapped_column(ForeignKey("questions.id"), nullable=False)
     text: Mapped[str] = mapped_column(nullable=False)
     is_correct: Mapped[bool] = mapped_column(nullable=False)
     incorrect_answers: Mapped[list["IncorrectAnswer"]] = relationship(
-        back_populates="answer", uselist=True, lazy="joined"
+        back_populates="answer", uselist=True, lazy="raise"
     )
 
 
@@ -134,14 +188,22 @@ class Result(Base):
     """
 
     __tablename__ = "results"
+    __table_args__ = (
+        Index("ix_results_test_id_score", "test_id", "score"),
+        Index("ix_results_user_id_test_id_score", "user_id", "test_id", "score"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    test: Mapped["Test"] = relationship(back_populates="results", uselist=False)
+    test: Mapped["Test"] = relationship(
+        back_populates="results", uselist=False, lazy="raise"
+    )
     test_id = mapped_column(ForeignKey("tests.id"), nullable=False)
-    user: Mapped["User"] = relationship(back_populates="results", uselist=False)
+    user: Mapped["User"] = relationship(
+        back_populates="results", uselist=False, lazy="raise"
+    )
     user_id = mapped_column(ForeignKey("users.id"), nullable=False)
     score: Mapped[int] = mapped_column(nullable=False)
     incorrect_answers: Mapped[list["IncorrectAnswer"]] = relationship(
-        back_populates="result", uselist=True, lazy="joined"
+        back_populates="result", uselist=True, lazy="raise"
     )
 
 
@@ -156,24 +218,99 @@ class IncorrectAnswer(Base):
     """
 
     __tablename__ = "incorrect_answers"
+    __table_args__ = (Index("ix_incorrect_answers_result_id", "result_id"),)
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     result: Mapped["Result"] = relationship(
-        back_populates="incorrect_answers", uselist=False
+        back_populates="incorrect_answers", uselist=False, lazy="raise"
     )
     result_id = mapped_column(ForeignKey("results.id"), nullable=False)
     question: Mapped["Question"] = relationship(
-        back_populates="incorrect_answers", uselist=False
+        back_populates="incorrect_answers", uselist=False, lazy="raise"
     )
     question_id = mapped_column(ForeignKey("questions.id"), nullable=False)
     answer: Mapped["Answer"] = relationship(
-        back_populates="incorrect_answers", uselist=False
+        back_populates="incorrect_answers", uselist=False, lazy="raise"
     )
     answer_id = mapped_column(ForeignKey("answers.id"), nullable=False)
 
 
-def create_tables() -> None:
-    """Создание таблиц."""
-    Base.metadata.create_all(engine)
+class TestStatistics(Base):
+    """
+    Модель статистики теста.
+
+    Обновляется при сохранении результатов.
 
+    test_id: int - id теста.
+    attempts: int - количество попыток.
+    passes: int - количество успешных попыток.
+    """
 
-create_tables()
+    __tablename__ = "test_statistics"
+    test_id = mapped_column(ForeignKey("tests.id"), primary_key=True)
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    passes: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class TestScoreBucket(Base):
+    """
+    Модель корзины гистограммы результатов теста.
+
+    test_id: int - id теста.
+    bucket: int - номер корзины, результат // 10 (100 баллов - в корзине 9).
+    count: int - количество попыток с результатом в корзине.
+    """
+
+    __tablename__ = "test_score_buckets"
+    test_id = mapped_column(ForeignKey("tests.id"), primary_key=True)
+    bucket: Mapped[int] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class UserStatistics(Base):
+    """
+    Модель статистики пользователя.
+
+    user_id: int - id пользователя.
+    attempts: int - количество попыток.
+    passed_tests: int - количество пройденных тестов.
+    """
+
+    __tablename__ = "user_statistics"
+    user_id = mapped_column(ForeignKey("users.id"), primary_key=True)
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    passed_tests: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class FSMRecord(Base):
+    """
+    Модель записи хранилища FSM.
+
+    key: str - ключ записи.
+    state: str - состояние.
+    data: dict - данные.
+    expires_at: datetime - время, после которого запись устаревает.
+    """
+
+    __tablename__ = "fsm_records"
+    key: Mapped[str] = mapped_column(primary_key=True)
+    state: Mapped[str] = mapped_column(nullable=True)
+    data: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    expires_at: Mapped[datetime] = mapped_column(nullable=True, index=True)
+
+
+def insert(model: type[Base]) -> Insert:
+    """
+    Конструкция INSERT с поддержкой ON CONFLICT для текущей базы.
+
+    Args:
+        model: Модель таблицы.
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+async def create_tables() -> None:
+    """Создание таблиц."""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
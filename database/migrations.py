@@ -0,0 +1,185 @@
+"""
+Модуль миграций базы данных.
+
+Версия схемы хранится в таблице schema_version. Миграции применяются по
+порядку, каждая в своей транзакции, начиная со следующей после текущей
+версии.
+
+Запуск из корня репозитория:
+    python -m database.migrations          - обновление схемы
+    python -m database.migrations current  - текущая версия схемы
+
+Функции:
+    get_version:
+        Получение текущей версии схемы.
+    upgrade:
+        Применение недостающих миграций.
+"""
+
+import asyncio
+import os
+import sys
+from typing import Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config import lexicon
+from database.database import Base, Question, engine
+from database.statistics import rebuild_test_statistics, rebuild_user_statistics
+from utils.image_store import KEY_PATTERN, image_store
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, nullable=False),
+)
+
+
+async def _create_tables(connection: AsyncConnection) -> None:
+    await connection.run_sync(Base.metadata.create_all)
+
+
+def _create_indexes(*names: str) -> Callable[[AsyncConnection], Awaitable[None]]:
+    async def migration(connection: AsyncConnection) -> None:
+        for table in Base.metadata.tables.values():
+            for index in table.indexes:
+                if index.name in names:
+                    await connection.run_sync(index.create, checkfirst=True)
+
+    return migration
+
+
+async def _create_statistics(connection: AsyncConnection) -> None:
+    for table in ("test_statistics", "test_score_buckets", "user_statistics"):
+        await connection.run_sync(Base.metadata.tables[table].create, checkfirst=True)
+    await rebuild_test_statistics(connection)
+    await rebuild_user_statistics(connection)
+
+
+def _add_columns(
+    table: str, *names: str
+) -> Callable[[AsyncConnection], Awaitable[None]]:
+    async def migration(connection: AsyncConnection) -> None:
+        existing = await connection.run_sync(
+            lambda sync_connection: {
+                column["name"] for column in inspect(sync_connection).get_columns(table)
+            }
+        )
+        for name in names:
+            if name in existing:
+                continue
+            column = Base.metadata.tables[table].c[name]
+            column_type = column.type.compile(dialect=connection.dialect)
+            await connection.execute(
+                text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+            )
+
+    return migration
+
+
+async def _move_images(connection: AsyncConnection) -> None:
+    # Файлы img/test_{id}/img_{n}.jpg переносятся в хранилище изображений,
+    # а вопросы начинают ссылаться на них по ключу. Старые папки не
+    # удаляются, чтобы миграцию можно было повторить.
+    rows = await connection.execute(
+        select(Question.id, Question.test_id, Question.image).where(
+            Question.image.is_not(None)
+        )
+    )
+    for question_id, test_id, image in rows.all():
+        if KEY_PATTERN.fullmatch(image):
+            continue
+        path = os.path.join("img", f"test_{test_id}", image)
+        if not os.path.exists(path):
+            logger.warning(lexicon.LOGS["missing image"].format(path=path))
+            continue
+        with open(path, "rb") as file:
+            key = await image_store.put(file.read())
+        await connection.execute(
+            update(Question).where(Question.id == question_id).values(image=key)
+        )
+
+
+# Миграции: версия, описание, функция
+MIGRATIONS: list[tuple[int, str, Callable[[AsyncConnection], Awaitable[None]]]] = [
+    (1, "create tables", _create_tables),
+    (
+        2,
+        "add lookup indexes",
+        _create_indexes(
+            "ix_questions_test_id",
+            "ix_answers_question_id_is_correct",
+            "ix_results_test_id_score",
+            "ix_results_user_id_test_id_score",
+            "ix_incorrect_answers_result_id",
+        ),
+    ),
+    (3, "add result statistics", _create_statistics),
+    (4, "add question image file id", _add_columns("questions", "file_id")),
+    (5, "move images to content-addressed store", _move_images),
+]
+
+
+async def get_version(connection: AsyncConnection) -> int:
+    """
+    Получение текущей версии схемы.
+
+    Args:
+        connection: Соединение с базой данных.
+    """
+    await connection.run_sync(schema_version.create, checkfirst=True)
+    version = await connection.scalar(select(schema_version.c.version))
+    return version or 0
+
+
+async def upgrade() -> int:
+    """
+    Применение недостающих миграций.
+
+    Returns:
+        Версия схемы после обновления.
+    """
+    async with engine.begin() as connection:
+        version = await get_version(connection)
+
+    for number, description, migration in MIGRATIONS:
+        if number <= version:
+            continue
+        async with engine.begin() as connection:
+            await migration(connection)
+            await connection.execute(schema_version.delete())
+            await connection.execute(schema_version.insert().values(version=number))
+        logger.info(
+            lexicon.LOGS["migration applied"].format(
+                version=number, description=description
+            )
+        )
+        version = number
+
+    return version
+
+
+async def _main(command: str) -> None:
+    if command == "upgrade":
+        version = await upgrade()
+    else:
+        async with engine.begin() as connection:
+            version = await get_version(connection)
+    print(version)
+    await image_store.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
@@ -0,0 +1,108 @@
+"""
+Модуль постраничной выборки.
+
+Страницы строятся по ключу (keyset): запрос каждой страницы ограничен
+LIMIT и условием на ключ, поэтому его стоимость не зависит от размера
+таблицы.
+
+Классы:
+    Page - страница выборки.
+
+Функции:
+    paginate:
+        Получение страницы выборки по курсору.
+"""
+
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from config import config
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Page(Generic[T]):
+    """
+    Страница выборки.
+
+    items: list - элементы страницы.
+    prev_cursor: int | None - курсор предыдущей страницы.
+    next_cursor: int | None - курсор следующей страницы.
+    """
+
+    items: list[T] = field(default_factory=list)
+    prev_cursor: int | None = None
+    next_cursor: int | None = None
+
+
+async def paginate(
+    session: AsyncSession,
+    statement: Select,
+    key: InstrumentedAttribute,
+    after: int | None = None,
+    before: int | None = None,
+    descending: bool = False,
+    limit: int | None = None,
+) -> Page:
+    """
+    Получение страницы выборки по курсору.
+
+    Args:
+        session:
+            Сессия базы данных.
+        statement:
+            Запрос без сортировки и ограничения.
+        key:
+            Уникальный столбец, по которому строятся страницы.
+        after:
+            Значение ключа, после которого начинается страница.
+        before:
+            Значение ключа, перед которым заканчивается страница.
+        descending:
+            Сортировка по убыванию ключа.
+        limit:
+            Размер страницы.
+
+    Returns:
+        Страница выборки.
+    """
+    limit = limit or config.page_size
+    backward = before is not None
+    cursor = before if backward else after
+
+    if cursor is not None:
+        statement = statement.where(
+            key > cursor if descending == backward else key < cursor
+        )
+    statement = statement.order_by(
+        key.asc() if descending == backward else key.desc()
+    ).limit(limit + 1)
+
+    rows = await session.execute(statement)
+    items = list(rows.all())
+    if len(rows.keys()) == 1:
+        items = [row[0] for row in items]
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    if backward:
+        items.reverse()
+
+    if not items:
+        return Page(items=items)
+
+    def key_of(item) -> int:
+        return getattr(item, key.key)
+
+    has_prev = has_more if backward else cursor is not None
+    has_next = cursor is not None if backward else has_more
+    return Page(
+        items=items,
+        prev_cursor=key_of(items[0]) if has_prev else None,
+        next_cursor=key_of(items[-1]) if has_next else None,
+    )
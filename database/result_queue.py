@@ -0,0 +1,196 @@
+"""
+Модуль очереди результатов.
+
+Результаты тестов сохраняются в фоне: обработчик кладет результат в
+очередь и сразу отвечает пользователю, а очередь записывает накопленные
+результаты пачками, когда их набирается RESULT_BATCH_SIZE или проходит
+RESULT_FLUSH_INTERVAL секунд. При остановке бота очередь сохраняет все
+оставшиеся результаты.
+
+Если пачка нарушает ограничения базы данных, она делится пополам, пока
+не останутся отдельные результаты: такой результат откладывается и
+пишется в лог, а остальные сохраняются. При других ошибках в начало
+очереди возвращаются только несохраненные части пачки, и они
+сохраняются при следующей попытке.
+Результаты, не сохраненные к остановке, тоже пишутся в лог.
+
+Классы:
+    ResultQueue - очередь отложенной записи результатов.
+
+Объекты:
+    result_queue - общий экземпляр очереди.
+"""
+
+import asyncio
+
+from loguru import logger
+from sqlalchemy.exc import DataError, IntegrityError
+
+from config import config, lexicon
+from database.user_connect import NewResult, save_results
+
+
+class ResultQueue:
+    """
+    Очередь отложенной записи результатов.
+
+    batch_size: int - максимальный размер пачки.
+    flush_interval: float - максимальное время ожидания пачки в секундах.
+    flushed: int - количество сохраненных результатов.
+    batches: int - количество сохраненных пачек.
+    failures: int - количество неудачных попыток сохранения.
+    rejected: list[NewResult] - результаты, отклоненные базой данных.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected: list[NewResult] = []
+        self._pending: list[NewResult] = []
+        # id тестов, удаленных во время записи текущей пачки
+        self._discarded: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    @property
+    def depth(self) -> int:
+        """Количество результатов, ожидающих сохранения."""
+        return len(self._pending)
+
+    def put(self, result: NewResult) -> None:
+        """
+        Добавление результата в очередь.
+
+        Args:
+            result: Результат теста.
+        """
+        self._pending.append(result)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def discard(self, test_id: int) -> int:
+        """
+        Удаление из очереди результатов теста.
+
+        Вызывается при удалении теста, чтобы его результаты не сохранились
+        после удаления.
+
+        Args:
+            test_id: Идентификатор теста.
+
+        Returns:
+            Количество удаленных результатов.
+        """
+        self._discarded.add(test_id)
+        depth = self.depth
+        self._pending = [
+            result for result in self._pending if result.test_id != test_id
+        ]
+        return depth - self.depth
+
+    async def flush(self) -> None:
+        """Сохранение всех накопленных результатов."""
+        while self._pending:
+            # Пачка извлекается до записи, чтобы discard не сдвигал ее границы
+            batch = self._pending[: self.batch_size]
+            del self._pending[: len(batch)]
+            self._discarded.clear()
+            unsaved = await self._save(batch)
+            if unsaved:
+                self._pending[:0] = [
+                    result
+                    for result in unsaved
+                    if result.test_id not in self._discarded
+                ]
+                return
+
+    async def _save(self, batch: list[NewResult]) -> list[NewResult]:
+        """
+        Сохранение пачки с отсевом результатов, нарушающих ограничения.
+
+        Пачка, нарушающая ограничения, делится пополам, и половины
+        сохраняются по отдельности. При другой ошибке запись прерывается,
+        а уже сохраненные части не возвращаются в очередь.
+
+        Args:
+            batch: Пачка результатов.
+
+        Returns:
+            Результаты, не сохраненные из-за ошибки.
+        """
+        parts = [batch]
+        while parts:
+            part = parts.pop(0)
+            try:
+                await save_results(part)
+            except (IntegrityError, DataError):
+                self.failures += 1
+                if len(part) == 1:
+                    self.rejected.append(part[0])
+                    logger.exception(
+                        lexicon.LOGS["result rejected"].format(result=part[0])
+                    )
+                    continue
+                middle = len(part) // 2
+                parts[:0] = [part[:middle], part[middle:]]
+                continue
+            except Exception:
+                self.failures += 1
+                unsaved = [result for rest in [part, *parts] for result in rest]
+                logger.exception(
+                    lexicon.LOGS["results flush failed"].format(
+                        depth=self.depth + len(unsaved)
+                    )
+                )
+                return unsaved
+            self.flushed += len(part)
+            self.batches += 1
+            logger.debug(
+                lexicon.LOGS["results flushed"].format(
+                    count=len(part), depth=self.depth
+                )
+            )
+        return []
+
+    async def close(self) -> None:
+        """Остановка очереди с сохранением оставшихся результатов."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        await self.flush()
+        for result in self._pending:
+            logger.error(lexicon.LOGS["result lost"].format(result=result))
+        self._pending.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Получение статистики очереди."""
+        return {
+            "depth": self.depth,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "rejected": len(self.rejected),
+        }
+
+
+result_queue = ResultQueue(
+    batch_size=config.database.result_batch_size,
+    flush_interval=config.database.result_flush_interval,
+)
@@ -0,0 +1,118 @@
+"""
+Модуль снимков тестов.
+
+Снимок - неизменяемое представление теста со всеми вопросами и ответами,
+загружаемое из базы данных одним запросом. Используется при прохождении
+теста, чтобы проверка ответов выполнялась в памяти.
+
+Классы:
+    AnswerSnapshot - снимок ответа.
+    QuestionSnapshot - снимок вопроса.
+    TestSnapshot - снимок теста.
+"""
+
+from dataclasses import dataclass, replace
+
+
+@dataclass(frozen=True, slots=True)
+class AnswerSnapshot:
+    """
+    Снимок ответа.
+
+    id: int - id ответа.
+    text: str - текст ответа.
+    is_correct: bool - является ли ответ правильным.
+    """
+
+    id: int
+    text: str
+    is_correct: bool
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionSnapshot:
+    """
+    Снимок вопроса.
+
+    id: int - id вопроса.
+    text: str - текст вопроса.
+    image: str | None - изображение вопроса.
+    answers: tuple[AnswerSnapshot, ...] - ответы на вопрос.
+    file_id: str | None - id файла изображения в Telegram.
+    """
+
+    id: int
+    text: str
+    image: str | None
+    answers: tuple[AnswerSnapshot, ...]
+    file_id: str | None = None
+
+    def get_answer(self, answer_id: int) -> AnswerSnapshot:
+        """
+        Получение ответа по id.
+
+        Args:
+            answer_id:
+                Идентификатор ответа.
+
+        Returns:
+            Ответ.
+        """
+        for answer in self.answers:
+            if answer.id == answer_id:
+                return answer
+        raise KeyError(answer_id)
+
+
+@dataclass(frozen=True, slots=True)
+class TestSnapshot:
+    """
+    Снимок теста.
+
+    id: int - id теста.
+    title: str - название теста.
+    description: str - описание теста.
+    questions: tuple[QuestionSnapshot, ...] - вопросы теста по порядку.
+    version: int - версия теста в кэше тестов, с которой загружен снимок.
+    """
+
+    id: int
+    title: str
+    description: str
+    questions: tuple[QuestionSnapshot, ...]
+    version: int = 0
+
+    def get_question(self, question_id: int) -> QuestionSnapshot:
+        """
+        Получение вопроса по id.
+
+        Args:
+            question_id:
+                Идентификатор вопроса.
+
+        Returns:
+            Вопрос.
+        """
+        for question in self.questions:
+            if question.id == question_id:
+                return question
+        raise KeyError(question_id)
+
+    def replace_question(self, question: QuestionSnapshot) -> "TestSnapshot":
+        """
+        Получение снимка с замененным вопросом.
+
+        Args:
+            question:
+                Новый снимок вопроса с тем же id.
+
+        Returns:
+            Новый снимок теста.
+        """
+        return replace(
+            self,
+            questions=tuple(
+                question if old.id == question.id else old
+                for old in self.questions
+            ),
+        )
@@ -0,0 +1,237 @@
+"""
+Модуль статистики результатов.
+
+Статистика тестов и пользователей хранится в таблицах test_statistics,
+test_score_buckets и user_statistics и обновляется при каждом сохранении
+результатов, поэтому экраны статистики читают несколько строк независимо
+от количества результатов. Таблицы можно пересчитать по результатам, например
+после изменения PASS_SCORE.
+
+Запуск из корня репозитория:
+    python -m database.statistics rebuild  - пересчет статистики
+
+Функции:
+    get_bucket:
+        Получение номера корзины гистограммы по результату.
+    update_statistics:
+        Обновление статистики по новым результатам.
+    rebuild_test_statistics:
+        Пересчет статистики тестов.
+    rebuild_user_statistics:
+        Пересчет статистики пользователей.
+    rebuild:
+        Пересчет всей статистики.
+"""
+
+import asyncio
+import sys
+from collections import Counter
+from typing import TYPE_CHECKING
+
+from sqlalchemy import case, delete, func, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from config import config
+from database.database import (
+    Result,
+    TestScoreBucket,
+    TestStatistics,
+    UserStatistics,
+    engine,
+    insert,
+)
+
+if TYPE_CHECKING:
+    from database.user_connect import NewResult
+
+BUCKETS = 10
+
+
+def get_bucket(score: int) -> int:
+    """
+    Получение номера корзины гистограммы по результату.
+
+    Args:
+        score: Результат теста в баллах.
+    """
+    return min(score * BUCKETS // 100, BUCKETS - 1)
+
+
+def _bucket_expression():
+    bucket = Result.score * BUCKETS // 100
+    return case((bucket > BUCKETS - 1, BUCKETS - 1), else_=bucket)
+
+
+async def _add(
+    session: AsyncSession, model, keys: list[str], rows: list[dict]
+) -> None:
+    if not rows:
+        return
+    statement = insert(model)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            column: getattr(model, column) + statement.excluded[column]
+            for column in rows[0]
+            if column not in keys
+        },
+    )
+    await session.execute(statement, rows)
+
+
+async def update_statistics(session: AsyncSession, results: list["NewResult"]) -> None:
+    """
+    Обновление статистики по новым результатам.
+
+    Вызывается в транзакции сохранения результатов до их вставки, чтобы
+    отличить первое успешное прохождение теста от повторного.
+
+    Args:
+        session: Сессия с открытой транзакцией.
+        results: Новые результаты тестов.
+    """
+    attempts = Counter(result.test_id for result in results)
+    passes = Counter(
+        result.test_id for result in results if result.score >= config.pass_score
+    )
+    buckets = Counter((result.test_id, get_bucket(result.score)) for result in results)
+    user_attempts = Counter(result.user_id for result in results)
+
+    passed = {
+        (result.user_id, result.test_id)
+        for result in results
+        if result.score >= config.pass_score
+    }
+    if passed:
+        already_passed = await session.execute(
+            select(Result.user_id, Result.test_id)
+            .where(tuple_(Result.user_id, Result.test_id).in_(passed))
+            .where(Result.score >= config.pass_score)
+            .distinct()
+        )
+        passed -= set(already_passed.tuples())
+    passed_tests = Counter(user_id for user_id, _ in passed)
+
+    await _add(
+        session,
+        TestStatistics,
+        ["test_id"],
+        [
+            {"test_id": test_id, "attempts": count, "passes": passes[test_id]}
+            for test_id, count in sorted(attempts.items())
+        ],
+    )
+    await _add(
+        session,
+        TestScoreBucket,
+        ["test_id", "bucket"],
+        [
+            {"test_id": test_id, "bucket": bucket, "count": count}
+            for (test_id, bucket), count in sorted(buckets.items())
+        ],
+    )
+    await _add(
+        session,
+        UserStatistics,
+        ["user_id"],
+        [
+            {
+                "user_id": user_id,
+                "attempts": count,
+                "passed_tests": passed_tests[user_id],
+            }
+            for user_id, count in sorted(user_attempts.items())
+        ],
+    )
+
+
+async def rebuild_test_statistics(
+    connection: AsyncConnection | AsyncSession, test_ids: list[int] | None = None
+) -> None:
+    """
+    Пересчет статистики тестов по результатам.
+
+    Args:
+        connection: Соединение или сессия с открытой транзакцией.
+        test_ids: Id тестов, по умолчанию - все тесты.
+    """
+    condition = true() if test_ids is None else Result.test_id.in_(test_ids)
+    bucket = _bucket_expression()
+
+    for model in (TestStatistics, TestScoreBucket):
+        await connection.execute(
+            delete(model).where(
+                true() if test_ids is None else model.test_id.in_(test_ids)
+            )
+        )
+    await connection.execute(
+        insert(TestStatistics).from_select(
+            ["test_id", "attempts", "passes"],
+            select(
+                Result.test_id,
+                func.count(Result.id),
+                func.count(Result.id).filter(Result.score >= config.pass_score),
+            )
+            .where(condition)
+            .group_by(Result.test_id),
+        )
+    )
+    await connection.execute(
+        insert(TestScoreBucket).from_select(
+            ["test_id", "bucket", "count"],
+            select(Result.test_id, bucket, func.count(Result.id))
+            .where(condition)
+            .group_by(Result.test_id, bucket),
+        )
+    )
+
+
+async def rebuild_user_statistics(
+    connection: AsyncConnection | AsyncSession, user_ids: list[int] | None = None
+) -> None:
+    """
+    Пересчет статистики пользователей по результатам.
+
+    Args:
+        connection: Соединение или сессия с открытой транзакцией.
+        user_ids: Id пользователей, по умолчанию - все пользователи.
+    """
+    condition = true() if user_ids is None else Result.user_id.in_(user_ids)
+
+    await connection.execute(
+        delete(UserStatistics).where(
+            true() if user_ids is None else UserStatistics.user_id.in_(user_ids)
+        )
+    )
+    await connection.execute(
+        insert(UserStatistics).from_select(
+            ["user_id", "attempts", "passed_tests"],
+            select(
+                Result.user_id,
+                func.count(Result.id),
+                func.count(func.distinct(Result.test_id)).filter(
+                    Result.score >= config.pass_score
+                ),
+            )
+            .where(condition)
+            .group_by(Result.user_id),
+        )
+    )
+
+
+async def rebuild() -> None:
+    """Пересчет всей статистики."""
+    async with engine.begin() as connection:
+        await rebuild_test_statistics(connection)
+        await rebuild_user_statistics(connection)
+
+
+async def _main(command: str) -> None:
+    if command != "rebuild":
+        raise SystemExit(f"Unknown command: {command}")
+    await rebuild()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "rebuild"))
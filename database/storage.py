@@ -0,0 +1,132 @@
+"""
+Модуль хранилищ FSM.
+
+Хранилище выбирается настройкой STORAGE: memory - в памяти процесса,
+redis - в Redis, sql - в таблице fsm_records основной базы данных.
+Записи Redis и SQL устаревают через STORAGE_TTL секунд бездействия, поэтому
+брошенные прохождения тестов не копятся.
+
+Классы:
+    SQLStorage - хранилище FSM в базе данных.
+
+Функции:
+    create_storage:
+        Создание хранилища FSM по настройкам.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete
+
+from config import StorageConfig
+from database.database import FSMRecord, Session, insert
+
+
+class SQLStorage(BaseStorage):
+    """
+    Хранилище FSM в базе данных.
+
+    ttl: int | None - время жизни записи в секундах.
+    """
+
+    def __init__(self, ttl: int | None = None) -> None:
+        self.ttl = ttl
+
+    @staticmethod
+    def build_key(key: StorageKey) -> str:
+        """Получение строкового ключа записи."""
+        return ":".join(
+            str(part)
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id or "",
+                key.destiny,
+            )
+        )
+
+    def _expires_at(self) -> datetime | None:
+        if self.ttl is None:
+            return None
+        return datetime.utcnow() + timedelta(seconds=self.ttl)
+
+    async def _get(self, key: StorageKey) -> FSMRecord | None:
+        async with Session() as session:
+            record = await session.get(FSMRecord, self.build_key(key))
+            if record is None:
+                return None
+            if record.expires_at and record.expires_at < datetime.utcnow():
+                await session.delete(record)
+                await session.commit()
+                return None
+            return record
+
+    async def _set(self, key: StorageKey, **values: Any) -> None:
+        values["expires_at"] = self._expires_at()
+        statement = insert(FSMRecord).values(key=self.build_key(key), **values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[FSMRecord.key], set_=values
+        )
+        async with Session() as session:
+            await session.execute(statement)
+            await session.commit()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._set(
+            key, state=state.state if isinstance(state, State) else state
+        )
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = await self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        await self._set(key, data=data.copy())
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = await self._get(key)
+        return dict(record.data) if record else {}
+
+    async def delete_expired(self) -> int:
+        """
+        Удаление устаревших записей.
+
+        Returns:
+            Количество удаленных записей.
+        """
+        async with Session() as session:
+            deleted = await session.execute(
+                delete(FSMRecord).where(FSMRecord.expires_at < datetime.utcnow())
+            )
+            await session.commit()
+            return deleted.rowcount
+
+    async def close(self) -> None:
+        pass
+
+
+def create_storage(storage_config: StorageConfig) -> BaseStorage:
+    """
+    Создание хранилища FSM по настройкам.
+
+    Args:
+        storage_config: Настройки хранилища.
+    """
+    if storage_config.type == "memory":
+        return MemoryStorage()
+    if storage_config.type == "sql":
+        return SQLStorage(ttl=storage_config.ttl)
+    if storage_config.type == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(
+            storage_config.url,
+            state_ttl=storage_config.ttl,
+            data_ttl=storage_config.ttl,
+        )
+    raise ValueError(f"Unknown storage type: {storage_config.type}")
@@ -0,0 +1,127 @@
+"""
+Модуль кэша пользователей.
+
+Хранит в памяти процесса краткие записи зарегистрированных пользователей
+по id в Telegram, чтобы обработчики не обращались к базе данных за
+пользователем на каждое обновление. Запись добавляется при регистрации и
+при первом обращении, устаревает через USER_CACHE_TTL секунд, а при
+переполнении вытесняется запись, к которой дольше всего не обращались.
+Незарегистрированные пользователи не кэшируются, поэтому регистрация в
+другом процессе видна сразу.
+
+Классы:
+    UserRecord - краткая запись пользователя.
+    UserCache - LRU-кэш пользователей с ограничением времени жизни.
+
+Объекты:
+    user_cache - общий экземпляр кэша.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from config import config
+
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """
+    Краткая запись пользователя.
+
+    id: int - id пользователя.
+    name: str - имя пользователя.
+    surname: str - фамилия пользователя.
+    """
+
+    id: int
+    name: str
+    surname: str
+
+
+Loader = Callable[[int], Awaitable[UserRecord | None]]
+
+
+class UserCache:
+    """
+    LRU-кэш пользователей с ограничением времени жизни.
+
+    max_size: int - максимальное количество записей.
+    ttl: float - время жизни записи в секундах.
+    hits: int - количество обращений без загрузки из базы данных.
+    misses: int - количество загрузок из базы данных.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        # id в Telegram -> запись и время, до которого она действительна
+        self._records: OrderedDict[int, tuple[UserRecord, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, tg_id: int, loader: Loader) -> UserRecord | None:
+        """
+        Получение пользователя.
+
+        Args:
+            tg_id:
+                Идентификатор пользователя в Telegram.
+            loader:
+                Функция загрузки пользователя из базы данных.
+
+        Returns:
+            Запись пользователя или None, если он не зарегистрирован.
+        """
+        cached = self._records.get(tg_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self._records.move_to_end(tg_id)
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        record = await loader(tg_id)
+        if record is None:
+            self._records.pop(tg_id, None)
+        else:
+            self.put(tg_id, record)
+        return record
+
+    def put(self, tg_id: int, record: UserRecord) -> None:
+        """
+        Сохранение пользователя.
+
+        Args:
+            tg_id:
+                Идентификатор пользователя в Telegram.
+            record:
+                Запись пользователя.
+        """
+        self._records[tg_id] = (record, time.monotonic() + self.ttl)
+        self._records.move_to_end(tg_id)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+
+    def invalidate(self, tg_id: int) -> None:
+        """
+        Сброс пользователя.
+
+        Args:
+            tg_id:
+                Идентификатор пользователя в Telegram.
+        """
+        self._records.pop(tg_id, None)
+
+    def stats(self) -> dict[str, int]:
+        """Получение статистики кэша."""
+        return {
+            "size": len(self._records),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+user_cache = UserCache(
+    max_size=config.database.user_cache_size, ttl=config.database.user_cache_ttl
+)
@@ -6,24 +6,30 @@
 Функции:
     get_user:
         Получение пользователя из базы данных.
+    get_user_record:
+        Получение краткой записи пользователя из кэша пользователей.
     create_user:
         Создание пользователя в базе данных.
     get_tests:
         Получение тестов для прохождения из базы данных.
     get_test:
-        Получение теста из базы данных.
-    get_questions:
-        Получение вопросов из базы данных.
-    save_result:
-        Сохранение результата теста в базу данных.
-    get_answers_by_question_id:
-        Получение ответов по id вопроса из базы данных.
-    get_answer_by_id:
-        Получение ответа по id ответа из базы данных.
+        Получение теста из кэша тестов.
+    get_test_snapshot:
+        Получение снимка теста с вопросами и ответами из кэша тестов.
+    set_question_file_id:
+        Сохранение id файла изображения вопроса в Telegram.
+    save_results:
+        Сохранение пачки результатов тестов в базу данных.
+
+Классы:
+    NewResult - результат теста, ожидающий сохранения.
 """
 
-from sqlalchemy import and_
-from sqlalchemy.orm import sessionmaker
+from dataclasses import replace
+from typing import NamedTuple
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.orm import load_only
 
 from config import config
 from database.database import (
@@ -33,13 +39,33 @@ from database.database import (
     Test,
     User,
     Answer,
+    Session,
     engine,
+    insert,
 )
+from database.cache import test_cache
+from database.user_cache import UserRecord, user_cache
+from database.snapshot import AnswerSnapshot, QuestionSnapshot, TestSnapshot
+from database.statistics import update_statistics
+
+
+class NewResult(NamedTuple):
+    """
+    Результат теста, ожидающий сохранения.
 
-Session = sessionmaker(engine)
+    user_id: int - id пользователя.
+    test_id: int - id теста.
+    score: int - результат теста в баллах.
+    incorrect_answers: list[tuple[int, int]] - пары id вопроса и id ответа.
+    """
+
+    user_id: int
+    test_id: int
+    score: int
+    incorrect_answers: list[tuple[int, int]]
 
 
-def get_user(tg_id: int) -> User | None:
+async def get_user(tg_id: int) -> User | None:
     """
     Получение пользователя из базы данных.
 
@@ -50,15 +76,55 @@ def get_user(tg_id: int) -> User | None:
     Returns:
         Пользователь.
     """
-    with Session() as session:
-        user = session.query(User).filter(User.tg_id == tg_id).one_or_none()
-        return user
+    async with Session() as session:
+        user = await session.scalars(select(User).where(User.tg_id == tg_id))
+        return user.one_or_none()
+
+
+async def get_user_record(tg_id: int) -> UserRecord | None:
+    """
+    Получение краткой записи пользователя из кэша пользователей.
+
+    При промахе загружаются только id, имя и фамилия пользователя.
+
+    Args:
+        tg_id:
+            Идентификатор пользователя в Telegram.
+
+    Returns:
+        Запись пользователя или None, если он не зарегистрирован.
+    """
+    return await user_cache.get(tg_id, _load_user_record)
+
+
+async def _load_user_record(tg_id: int) -> UserRecord | None:
+    """
+    Загрузка краткой записи пользователя из базы данных.
+
+    Args:
+        tg_id:
+            Идентификатор пользователя в Telegram.
+
+    Returns:
+        Запись пользователя или None, если он не зарегистрирован.
+    """
+    async with Session() as session:
+        row = await session.execute(
+            select(User.id, User.name, User.surname).where(User.tg_id == tg_id)
+        )
+        row = row.one_or_none()
+    return None if row is None else UserRecord(*row)
 
 
-def create_user(tg_id: int, name: str, surname: str) -> None:
+async def create_user(tg_id: int, name: str, surname: str) -> UserRecord:
     """
     Создание пользователя в базе данных.
 
+    Пользователь сохраняется одним запросом INSERT ... ON CONFLICT: при
+    повторной регистрации с тем же id в Telegram обновляются имя и фамилия,
+    поэтому одновременные регистрации одного пользователя не конфликтуют.
+    Пользователь сразу добавляется в кэш пользователей.
+
     Args:
         tg_id:
             Идентификатор пользователя в Telegram.
@@ -66,14 +132,25 @@ def create_user(tg_id: int, name: str, surname: str) -> None:
             Имя пользователя.
         surname:
             Фамилия пользователя.
-    """
-    with Session() as session:
-        user = User(tg_id=tg_id, name=name, surname=surname)
-        session.add(user)
-        session.commit()
 
-
-def get_tests(tg_id: int) -> list[Test]:
+    Returns:
+        Запись пользователя.
+    """
+    statement = insert(User).values(tg_id=tg_id, name=name, surname=surname)
+    statement = statement.on_conflict_do_update(
+        index_elements=[User.tg_id],
+        set_={"name": statement.excluded.name, "surname": statement.excluded.surname},
+    ).returning(User.id)
+    async with engine.connect() as connection:
+        # Запрос фиксируется сам, блокировка не удерживается до COMMIT
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        user_id = await connection.scalar(statement)
+    record = UserRecord(user_id, name, surname)
+    user_cache.put(tg_id, record)
+    return record
+
+
+async def get_tests(tg_id: int) -> list[Test]:
     """
     Получение тестов для прохождения из базы данных.
 
@@ -84,10 +161,11 @@ def get_tests(tg_id: int) -> list[Test]:
     Returns:
         Список тестов.
     """
-    with Session() as session:
-        user_id = session.query(User.id).filter(User.tg_id == tg_id).scalar()
-        tests = (
-            session.query(Test)
+    async with Session() as session:
+        user_id = await session.scalar(select(User.id).where(User.tg_id == tg_id))
+        tests = await session.scalars(
+            select(Test)
+            .options(load_only(Test.id, Test.title, raiseload=True))
             .outerjoin(
                 Result,
                 and_(
@@ -96,133 +174,165 @@ def get_tests(tg_id: int) -> list[Test]:
                     Result.score > config.pass_score,
                 ),
             )
-            .filter(Test.is_publish)
-            .filter(Result.id.is_(None))
-            .all()
+            .where(Test.is_publish)
+            .where(Result.id.is_(None))
         )
-        return tests
+        return list(tests)
 
 
-def get_test(test_id: int) -> Test:
+async def get_test(test_id: int) -> TestSnapshot:
     """
-    Получение теста из базы данных.
+    Получение теста из кэша тестов.
 
     Args:
         test_id:
             Идентификатор теста.
 
     Returns:
-        Тест.
+        Снимок теста.
     """
-    with Session() as session:
-        test = session.query(Test).filter(Test.id == test_id).one()
-        return test
+    return await get_test_snapshot(test_id)
 
 
-def get_questions(test_id: int) -> list[Question]:
+async def get_test_snapshot(test_id: int) -> TestSnapshot:
     """
-    Получение вопросов из базы данных.
+    Получение снимка теста с вопросами и ответами из кэша тестов.
+
+    При промахе снимок загружается из базы данных.
 
     Args:
         test_id:
             Идентификатор теста.
 
     Returns:
-        Список вопросов.
-    """
-    with Session() as session:
-        questions = (
-            session.query(Question)
-            .filter(Question.test_id == test_id)
-            .order_by(Question.id)
-            .all()
-        )
-        return questions
+        Снимок теста.
+    """
+    return await test_cache.get(test_id, _load_test_snapshot)
 
 
-def save_result(
-    user_id: int,
-    test_id: int,
-    result: dict[int, dict[int, bool]],
-) -> int:
+async def _load_test_snapshot(test_id: int) -> TestSnapshot:
     """
-    Сохранение результата теста в базу данных.
+    Загрузка снимка теста из базы данных.
+
+    Тест, вопросы и ответы загружаются одним запросом.
 
     Args:
-        user_id:
-            Идентификатор пользователя.
         test_id:
             Идентификатор теста.
-        result:
-            Результат теста.
-    """
-
-    incorrect_answers = [
-        (question_id, next(iter(answer)))
-        for question_id, answer in result.items()
-        if not next(iter(answer.values()))
-    ]
-
-    score = round((len(result) - len(incorrect_answers)) / len(result) * 100)
 
-    with Session() as session:
-        result_obj = Result(user_id=user_id, test_id=test_id, score=score)
-        session.add(result_obj)
-
-        session.commit()
-
-        incorrect_answer_objs = [
-            IncorrectAnswer(
-                question_id=question_id,
-                answer_id=answer_id,
-                result_id=result_obj.id,
+    Returns:
+        Снимок теста.
+    """
+    async with Session() as session:
+        rows = await session.execute(
+            select(
+                Test.title,
+                Test.description,
+                Question.id,
+                Question.text,
+                Question.image,
+                Question.file_id,
+                Answer.id,
+                Answer.text,
+                Answer.is_correct,
             )
-            for question_id, answer_id in incorrect_answers
-        ]
-
-        session.add_all(incorrect_answer_objs)
-
-        session.commit()
-
-        return score
-
-
-def get_answers_by_question_id(
-    question_id: int,
-) -> list[Answer]:
+            .outerjoin(Question, Question.test_id == Test.id)
+            .outerjoin(Answer, Answer.question_id == Question.id)
+            .where(Test.id == test_id)
+            .order_by(Question.id, Answer.id)
+        )
+        rows = rows.all()
+
+    if not rows:
+        raise LookupError(test_id)
+
+    questions: dict[int, tuple[str, str | None, str | None, list[AnswerSnapshot]]]
+    questions = {}
+    for row in rows:
+        _, _, question_id, text, image, file_id, answer_id, answer_text, correct = row
+        if question_id is None:
+            continue
+        answers = questions.setdefault(question_id, (text, image, file_id, []))[3]
+        if answer_id is not None:
+            answers.append(AnswerSnapshot(answer_id, answer_text, correct))
+
+    title, description = rows[0][0], rows[0][1]
+    return TestSnapshot(
+        id=test_id,
+        title=title,
+        description=description,
+        questions=tuple(
+            QuestionSnapshot(question_id, text, image, tuple(answers), file_id)
+            for question_id, (text, image, file_id, answers) in questions.items()
+        ),
+    )
+
+
+async def set_question_file_id(test_id: int, question_id: int, file_id: str) -> None:
     """
-    Получение ответов по id вопроса из базы данных.
+    Сохранение id файла изображения вопроса в Telegram.
+
+    Снимок теста в кэше обновляется без изменения версии, так как
+    содержание теста не меняется.
 
     Args:
+        test_id:
+            Идентификатор теста.
         question_id:
             Идентификатор вопроса.
-
-    Returns:
-        Список ответов.
-    """
-    with Session() as session:
-        answers = (
-            session.query(Answer)
-            .filter(Answer.question_id == question_id)
-            .order_by(Answer.id)
-            .all()
+        file_id:
+            Id файла в Telegram.
+    """
+    async with Session() as session:
+        await session.execute(
+            update(Question).where(Question.id == question_id).values(file_id=file_id)
         )
-        return answers
+        await session.commit()
+
+    test_cache.update(
+        test_id,
+        lambda snapshot: snapshot.replace_question(
+            replace(snapshot.get_question(question_id), file_id=file_id)
+        ),
+    )
 
 
-def get_answer_by_id(
-    answer_id: int,
-) -> Answer:
+async def save_results(results: list[NewResult]) -> None:
     """
-    Получение ответа по id из базы данных.
+    Сохранение пачки результатов тестов в базу данных.
 
-    Args:
-        answer_id:
-            Идентификатор ответа.
+    Результаты и неправильные ответы вставляются многострочными запросами
+    в одной транзакции вместе с обновлением статистики.
 
-    Returns:
-        Ответ.
+    Args:
+        results:
+            Результаты тестов.
     """
-    with Session() as session:
-        answer = session.query(Answer).filter(Answer.id == answer_id).one()
-        return answer
+    async with Session() as session:
+        await update_statistics(session, results)
+        inserted = await session.scalars(
+            insert(Result).returning(Result.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": result.user_id,
+                    "test_id": result.test_id,
+                    "score": result.score,
+                }
+                for result in results
+            ],
+        )
+        result_ids = inserted.all()
+
+        incorrect_answers = [
+            {
+                "question_id": question_id,
+                "answer_id": answer_id,
+                "result_id": result_id,
+            }
+            for result_id, result in zip(result_ids, results)
+            for question_id, answer_id in result.incorrect_answers
+        ]
+        if incorrect_answers:
+            await session.execute(insert(IncorrectAnswer), incorrect_answers)
+
+        await session.commit()
@@ -1,4 +1,4 @@
-import re
+import html
 
 from aiogram import Router, F
 from aiogram.filters import CommandStart, StateFilter
@@ -9,9 +9,20 @@ from loguru import logger
 from config import lexicon
 import keyboard.keyboard_builder as kb
 from database import admin_connect as db
+from keyboard.callback_data import (
+    CallbackAction,
+    PageCallback,
+    QuestionCallback,
+    ResultCallback,
+    TestCallback,
+    UserCallback,
+)
 
 router = Router()
 
+# Telegram message text limit
+MESSAGE_LIMIT = 4096
+
 
 @router.message(CommandStart(), StateFilter(default_state))
 async def cmd_start(message: Message):
@@ -44,13 +55,19 @@ async def call_main_menu(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "tests", StateFilter(default_state))
-async def call_tests(callback: CallbackQuery):
+@router.callback_query(
+    CallbackAction(PageCallback, "tests"), StateFilter(default_state)
+)
+async def call_tests(
+    callback: CallbackQuery,
+    callback_data: PageCallback = PageCallback(action="tests"),
+):
     admin_id = callback.from_user.id
 
     logger.debug(lexicon.LOGS["tests"].format(admin_id=admin_id))
 
-    tests = db.get_tests()
-    keyboard = kb.create_tests_menu_keyboard(tests=tests, is_admin=True)
+    page = await db.get_tests(after=callback_data.after, before=callback_data.before)
+    keyboard = kb.create_tests_menu_keyboard(page=page, is_admin=True)
 
     await callback.message.edit_text(
         text=lexicon.MESSAGES["tests"],
@@ -60,15 +77,27 @@ async def call_tests(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "users", StateFilter(default_state))
-async def call_users(callback: CallbackQuery):
+@router.callback_query(
+    CallbackAction(PageCallback, "users"), StateFilter(default_state)
+)
+async def call_users(
+    callback: CallbackQuery,
+    callback_data: PageCallback = PageCallback(action="users"),
+):
     """Users menu."""
     admin_id = callback.from_user.id
 
     # DEBUG LOG
     logger.debug(lexicon.LOGS["users"].format(admin_id=admin_id))
 
-    users = db.get_users()
-    keyboard = kb.create_users_menu_keyboard(users=users)
+    page = await db.get_users(after=callback_data.after, before=callback_data.before)
+    keyboard = kb.create_users_menu_keyboard(
+        page=page,
+        completed=await db.get_count_results_by_users(
+            user_ids=[user.id for user in page.items]
+        ),
+        total=await db.get_count_tests(),
+    )
     await callback.message.edit_text(
         text=lexicon.MESSAGES["users"],
         reply_markup=keyboard,
@@ -76,31 +105,36 @@ async def call_users(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(
-    lambda call: re.fullmatch(r"test \d+", call.data),
-    StateFilter(default_state),
-)
-async def call_test(callback: CallbackQuery):
+@router.callback_query(CallbackAction(TestCallback, "open"), StateFilter(default_state))
+async def call_test(callback: CallbackQuery, callback_data: TestCallback):
     """Test menu."""
-    test_id = int(callback.data.split()[1])
+    test_id = callback_data.test_id
     admin_id = callback.from_user.id
 
     # DEBUG LOG
     logger.debug(lexicon.LOGS["test"].format(admin_id=admin_id, test_id=test_id))
 
-    test = db.get_test_by_id(test_id=test_id)
-    questions = db.get_questions_by_test_id(test_id=test_id)
+    test = await db.get_test_by_id(test_id=test_id)
+    count_questions = await db.get_count_questions_by_test_id(test_id=test_id)
     keyboard = kb.create_test_menu_keyboard(
-        test=test, questions=questions, is_publish=test.is_publish
+        test=test, count_questions=count_questions, is_publish=test.is_publish
     )
     text = f"<b>{test.title}</b>\n{test.description}"
 
     if test.is_publish:
-        statistics = db.get_statistics_by_test_id(test_id=test_id)
+        statistics = await db.get_statistics_by_test_id(test_id=test_id)
         text += lexicon.MESSAGES["test statistics"].format(
             completed=statistics["completed"],
             total=statistics["total"],
         )
+        if statistics["total"]:
+            text += lexicon.MESSAGES["score histogram"]
+            for bucket, count in enumerate(statistics["histogram"]):
+                text += lexicon.MESSAGES["score histogram row"].format(
+                    low=bucket * 10,
+                    high=100 if bucket == 9 else bucket * 10 + 9,
+                    count=count,
+                )
 
     await callback.message.edit_text(
         text=text,
@@ -110,14 +144,15 @@ async def call_test(callback: CallbackQuery):
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"test_questions_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "questions"), StateFilter(default_state)
 )
-async def call_test_questions(callback: CallbackQuery):
+async def call_test_questions(callback: CallbackQuery, callback_data: TestCallback):
     """Test questions menu"""
-    test_id = callback.data.split("_")[2]
-    test = db.get_test_by_id(test_id=test_id)
-    questions = db.get_questions_by_test_id(test_id)
+    test_id = callback_data.test_id
+    test = await db.get_test_by_id(test_id=test_id)
+    page = await db.get_questions_by_test_id(
+        test_id, after=callback_data.after, before=callback_data.before
+    )
     admin_id = callback.from_user.id
 
     # DEBUG LOG
@@ -125,7 +160,7 @@ async def call_test_questions(callback: CallbackQuery):
         lexicon.LOGS["test questions"].format(admin_id=admin_id, test_id=test_id)
     )
 
-    keyboard = kb.create_questions_menu_keyboard(questions=questions)
+    keyboard = kb.create_questions_menu_keyboard(page=page, test_id=test_id)
 
     await callback.message.edit_text(
         text=lexicon.MESSAGES["test questions"].format(test_name=test.title),
@@ -134,12 +169,64 @@ async def call_test_questions(callback: CallbackQuery):
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"question_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "analytics"), StateFilter(default_state)
+)
+async def call_test_analytics(callback: CallbackQuery, callback_data: TestCallback):
+    """Test question analytics"""
+    test_id = callback_data.test_id
+    admin_id = callback.from_user.id
+
+    # DEBUG LOG
+    logger.debug(
+        lexicon.LOGS["test analytics"].format(admin_id=admin_id, test_id=test_id)
+    )
+
+    test = await db.get_test_by_id(test_id=test_id)
+    analytics = await db.get_question_analytics(test_id=test_id)
+    text = lexicon.MESSAGES["test analytics"].format(
+        test_name=html.escape(test.title)
+    )
+
+    if not analytics or analytics[0].correct_rate is None:
+        text += lexicon.MESSAGES["test analytics empty"]
+    else:
+        for number, question in enumerate(analytics, start=1):
+            block = lexicon.MESSAGES["question analytics"].format(
+                number=number,
+                text=html.escape(question.text),
+                correct_rate=f"{question.correct_rate:.0%}",
+                discrimination=(
+                    "-"
+                    if question.discrimination is None
+                    else f"{question.discrimination:.2f}"
+                ),
+            )
+            for answer_text, is_correct, count in question.picks:
+                block += lexicon.MESSAGES["answer analytics"].format(
+                    mark="✅" if is_correct else "❌",
+                    text=html.escape(answer_text),
+                    count=count,
+                )
+            if len(text) + len(block) > MESSAGE_LIMIT - 2:
+                text += "\n…"
+                break
+            text += block
+
+    await callback.message.edit_text(
+        text=text,
+        reply_markup=kb.create_back_button_keyboard(
+            callback_data=TestCallback(action="open", test_id=test_id).pack()
+        ),
+    )
+    await callback.answer()
+
+
+@router.callback_query(
+    CallbackAction(QuestionCallback, "open"), StateFilter(default_state)
 )
-async def call_question(callback: CallbackQuery):
+async def call_question(callback: CallbackQuery, callback_data: QuestionCallback):
     """Question menu"""
-    question_id = int(callback.data.split("_")[1])
+    question_id = callback_data.question_id
     admin_id = callback.from_user.id
 
     # DEBUG LOG
@@ -147,8 +234,9 @@ async def call_question(callback: CallbackQuery):
         lexicon.LOGS["question"].format(admin_id=admin_id, question_id=question_id)
     )
 
-    question, answers = db.get_question_by_id(question_id=question_id)
+    question, answers = await db.get_question_by_id(question_id=question_id)
     keyboard = kb.create_question_menu_keyboard(
+        question=question,
         answers=answers,
     )
 
@@ -159,50 +247,49 @@ async def call_question(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(
-    lambda call: re.fullmatch(r"user_\d+", call.data),
-    StateFilter(default_state),
-)
-async def call_user(callback: CallbackQuery):
+@router.callback_query(CallbackAction(UserCallback), StateFilter(default_state))
+async def call_user(callback: CallbackQuery, callback_data: UserCallback):
     """User menu"""
-    user_id = int(callback.data.split("_")[1])
+    user_id = callback_data.user_id
     admin_id = callback.from_user.id
 
     # DEBUG LOG
     logger.debug(lexicon.LOGS["user"].format(admin_id=admin_id, user_id=user_id))
 
-    user = db.get_user_by_id(user_id=user_id)
-    results = db.get_results_by_user_id(user_id=user_id)
-    keyboard = kb.create_user_menu_keyboard(user=user)
+    user = await db.get_user_by_id(user_id=user_id)
+    statistics = await db.get_count_results_by_user_id(user_id=user_id)
+    page = await db.get_results_by_user_id(
+        user_id=user_id, after=callback_data.after, before=callback_data.before
+    )
+    keyboard = kb.create_user_menu_keyboard(page=page, user_id=user_id)
 
     await callback.message.edit_text(
-        text=lexicon.MESSAGES["user statistics"].format(user=user, results=results),
+        text=lexicon.MESSAGES["users statistics"].format(
+            user=user, results=statistics
+        ),
         reply_markup=keyboard,
     )
     await callback.answer()
 
 
-@router.callback_query(
-    lambda call: re.fullmatch(r"result_\d+", call.data),
-    StateFilter(default_state),
-)
-async def call_result(call: CallbackQuery):
+@router.callback_query(CallbackAction(ResultCallback), StateFilter(default_state))
+async def call_result(call: CallbackQuery, callback_data: ResultCallback):
     """Result menu"""
-    result_id = int(call.data.split("_")[1])
+    result_id = callback_data.result_id
     admin_id = call.from_user.id
 
     # DEBUG LOG
     logger.debug(lexicon.LOGS["result"].format(admin_id=admin_id, result_id=result_id))
 
-    result = db.get_result_by_id(result_id=result_id)
-    test = db.get_test_by_id(result.test_id)
-    result_data = db.get_result_data_by_result(result)
+    result = await db.get_result_by_id(result_id=result_id)
+    test = await db.get_test_by_id(result.test_id)
+    result_data = await db.get_result_data_by_result(result)
     text = f"<b>{test.title}</b>\n\n"
     text += "\n".join(
         [f"<u>{data[0]}</u>\n<s>{data[2]}</s>\n{data[1]}\n" for data in result_data]
     )
     keyboard = kb.create_back_button_keyboard(
-        callback_data=f"user_{result.user_id}",
+        callback_data=UserCallback(user_id=result.user_id).pack(),
     )
 
     await call.message.edit_text(
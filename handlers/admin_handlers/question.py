@@ -1,5 +1,3 @@
-import re
-
 from aiogram import Router, F
 from aiogram.filters.state import StateFilter
 from aiogram.fsm.context import FSMContext
@@ -17,24 +15,26 @@ from config import lexicon
 from database import admin_connect as db
 from handlers.admin_handlers.states import FSMCreateQuestions
 import keyboard.keyboard_builder as kb
-from utils import admin_utils as utils
+from keyboard.callback_data import CallbackAction, TestCallback
+from utils.image_store import image_store
 
 router = Router()
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"add_question_test_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "add_question"), StateFilter(default_state)
 )
-async def call_add_question(callback: CallbackQuery, state: FSMContext):
+async def call_add_question(
+    callback: CallbackQuery, state: FSMContext, callback_data: TestCallback
+):
     """Create question."""
-    await state.update_data(test_id=int(callback.data.split("_")[3]))
+    await state.update_data(test_id=callback_data.test_id)
     await state.update_data(answers=[])
 
     # DEBUG LOG
     logger.debug(
         lexicon.MESSAGES["add question"].format(
-            admin_id=callback.from_user.id, test_id=callback.data.split("_")[3]
+            admin_id=callback.from_user.id, test_id=callback_data.test_id
         )
     )
 
@@ -100,22 +100,19 @@ async def process_input_image_question(message: Message, state: FSMContext):
     question = data["text"]
     answers = data["answers"]
     photo: PhotoSize = message.photo[-1]
-    photo_path = photo.file_id
-    number_image = utils.get_next_number_image(test_id)
-    await message.bot.download(
-        photo_path,
-        destination=f"img/test_{test_id}/img_{number_image}.jpg",
-    )
-    db.create_question(
+    content = await message.bot.download(photo.file_id)
+    image = await image_store.put(content.getvalue())
+    await db.create_question(
         test_id=test_id,
         text=question,
         answers=answers,
-        image=f"img_{number_image}.jpg",
+        image=image,
+        file_id=photo.file_id,
     )
-    test = db.get_test_by_id(test_id)
+    test = await db.get_test_by_id(test_id)
     keyboard = kb.create_test_menu_keyboard(
         test=test,
-        questions=db.get_questions_by_test_id(test_id),
+        count_questions=await db.get_count_questions_by_test_id(test_id),
         is_publish=test.is_publish,
     )
     await message.answer(
@@ -133,15 +130,15 @@ async def process_skip_image_question(callback: CallbackQuery, state: FSMContext
     test_id = data["test_id"]
     question = data["text"]
     answers = data["answers"]
-    db.create_question(
+    await db.create_question(
         test_id=test_id,
         text=question,
         answers=answers,
     )
-    test = db.get_test_by_id(test_id)
+    test = await db.get_test_by_id(test_id)
     keyboard = kb.create_test_menu_keyboard(
         test=test,
-        questions=db.get_questions_by_test_id(test_id),
+        count_questions=await db.get_count_questions_by_test_id(test_id),
         is_publish=test.is_publish,
     )
     await callback.message.edit_text(
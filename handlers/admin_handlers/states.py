@@ -6,6 +6,10 @@ class FSMCreateTest(StatesGroup):
     description = State()
 
 
+class FSMImportTest(StatesGroup):
+    document = State()
+
+
 class FSMCreateQuestions(StatesGroup):
     text = State()
     answers = State()
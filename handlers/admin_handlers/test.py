@@ -1,21 +1,32 @@
-import re
+import html
+import io
+import os
+import time
 
 from aiogram import F, Router
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, FSInputFile, Message
 from loguru import logger
 
-from config import lexicon
+from config import config, lexicon
 from database import admin_connect as db
-from handlers.admin_handlers.states import FSMCreateTest
+from handlers.admin_handlers.states import FSMCreateTest, FSMImportTest
 from keyboard import keyboard_builder as kb
+from keyboard.callback_data import CallbackAction, QuestionCallback, TestCallback
 from utils import admin_utils as utils
+from utils import import_utils
+from utils.image_store import image_store
 
 router = Router()
 
+# Minimum seconds between export progress updates
+PROGRESS_INTERVAL = 1.0
+# Maximum validation errors shown for an imported file
+MAX_IMPORT_ERRORS = 20
+
 
 @router.callback_query(F.data == "add test", StateFilter(default_state))
 async def call_add_test(callback: CallbackQuery, state: FSMContext):
@@ -29,16 +40,96 @@ async def call_add_test(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+@router.callback_query(F.data == "import test", StateFilter(default_state))
+async def call_import_test(callback: CallbackQuery, state: FSMContext):
+    """Start import test"""
+    await callback.message.edit_text(
+        text=lexicon.MESSAGES["import test"],
+        reply_markup=kb.create_back_button_keyboard(
+            callback_data="cancel import", mgs=lexicon.BUTTONS["cancel"]
+        ),
+    )
+    await state.set_state(FSMImportTest.document)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "cancel import", StateFilter(FSMImportTest.document))
+async def call_cancel_import_test(callback: CallbackQuery, state: FSMContext):
+    """Cancel import test"""
+    await state.clear()
+    await callback.message.edit_text(
+        text=lexicon.MESSAGES["tests"],
+        reply_markup=kb.create_tests_menu_keyboard(
+            page=await db.get_tests(),
+            is_admin=True,
+        ),
+    )
+    await callback.answer()
+
+
+@router.message(F.document, StateFilter(FSMImportTest.document))
+async def process_import_test(message: Message, state: FSMContext):
+    """Import test from uploaded document"""
+    await state.clear()
+    content = io.BytesIO()
+    await message.bot.download(message.document, destination=content)
+
+    try:
+        imported = import_utils.parse_test_file(
+            message.document.file_name or "", content.getvalue()
+        )
+    except import_utils.TestImportError as error:
+        await message.answer(
+            text=lexicon.MESSAGES["import test failed"].format(
+                errors=html.escape("\n".join(error.errors[:MAX_IMPORT_ERRORS]))
+            ),
+            reply_markup=kb.create_back_button_keyboard(callback_data="tests"),
+        )
+        return
+
+    await import_utils.save_images(imported.images)
+    test_id = await db.import_test(
+        title=imported.title,
+        description=imported.description,
+        questions=[
+            (question.text, question.answers, question.image)
+            for question in imported.questions
+        ],
+    )
+
+    # DEBUG LOG
+    logger.debug(
+        lexicon.LOGS["import test"].format(
+            admin_id=message.from_user.id,
+            test_id=test_id,
+            count=len(imported.questions),
+        )
+    )
+
+    test = await db.get_test_by_id(test_id)
+    await message.answer(
+        text=lexicon.MESSAGES["import test done"].format(
+            title=html.escape(test.title), count=len(imported.questions)
+        ),
+        reply_markup=kb.create_test_menu_keyboard(
+            test=test,
+            count_questions=len(imported.questions),
+            is_publish=test.is_publish,
+        ),
+    )
+
+
 @router.callback_query(
-    lambda call: re.fullmatch(r"confirm_delete_test_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "confirm_delete"), StateFilter(default_state)
 )
-async def call_confirm_delete_test(callback: CallbackQuery):
+async def call_confirm_delete_test(
+    callback: CallbackQuery, callback_data: TestCallback
+):
     """Confirm delete test"""
-    test_id = int(callback.data.split("_")[3])
+    test_id = callback_data.test_id
     keyboard = kb.create_confirm_keyboard(
-        callback_yes=f"delete_test_{test_id}",
-        callback_no=f"test_{test_id}",
+        callback_yes=TestCallback(action="delete", test_id=test_id).pack(),
+        callback_no=TestCallback(action="open", test_id=test_id).pack(),
     )
 
     # DEBUG LOG
@@ -56,16 +147,16 @@ async def call_confirm_delete_test(callback: CallbackQuery):
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"delete_test_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "delete"), StateFilter(default_state)
 )
-async def call_delete_test(callback: CallbackQuery):
+async def call_delete_test(callback: CallbackQuery, callback_data: TestCallback):
     """Delete test"""
-    test_id = int(callback.data.split("_")[2])
-    utils.delete_test_dir(test_id)
-    db.delete_test_by_id(test_id)
+    test_id = callback_data.test_id
+    await image_store.release(
+        await db.delete_test_by_id(test_id), db.get_image_keys, config.images.gc_grace
+    )
     keyboard = kb.create_tests_menu_keyboard(
-        tests=db.get_tests(),
+        page=await db.get_tests(),
         is_admin=True,
     )
 
@@ -83,15 +174,16 @@ async def call_delete_test(callback: CallbackQuery):
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"confirm_publish_test_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "confirm_publish"), StateFilter(default_state)
 )
-async def call_confirm_publish_test(callback: CallbackQuery):
+async def call_confirm_publish_test(
+    callback: CallbackQuery, callback_data: TestCallback
+):
     """Confirm publish test"""
-    test_id = int(callback.data.split("_")[3])
+    test_id = callback_data.test_id
     keyboard = kb.create_confirm_keyboard(
-        callback_yes=f"publish_test_{test_id}",
-        callback_no=f"test_{test_id}",
+        callback_yes=TestCallback(action="publish", test_id=test_id).pack(),
+        callback_no=TestCallback(action="open", test_id=test_id).pack(),
     )
 
     # DEBUG LOG
@@ -109,15 +201,14 @@ async def call_confirm_publish_test(callback: CallbackQuery):
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"publish_test_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "publish"), StateFilter(default_state)
 )
-async def call_publish_test(callback: CallbackQuery):
+async def call_publish_test(callback: CallbackQuery, callback_data: TestCallback):
     """Publish test"""
-    test_id = int(callback.data.split("_")[2])
-    db.publish_test_by_id(test_id)
+    test_id = callback_data.test_id
+    await db.publish_test_by_id(test_id)
     keyboard = kb.create_tests_menu_keyboard(
-        tests=db.get_tests(),
+        page=await db.get_tests(),
         is_admin=True,
     )
 
@@ -136,16 +227,67 @@ async def call_publish_test(callback: CallbackQuery):
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"edit_correct_answer_\d+_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "export"), StateFilter(default_state)
 )
-async def call_edit_correct_answer(callback: CallbackQuery):
+async def call_export_results(callback: CallbackQuery, callback_data: TestCallback):
+    """Export results of test to CSV"""
+    test_id = callback_data.test_id
+    total = (await db.get_statistics_by_test_id(test_id=test_id))["total"]
+    await callback.answer()
+
+    if not total:
+        await callback.message.answer(text=lexicon.MESSAGES["export results empty"])
+        return
+
+    progress = await callback.message.answer(
+        text=lexicon.MESSAGES["export results"].format(exported=0, total=total)
+    )
+    path = utils.create_results_file(test_id)
+    exported = 0
+    updated_at = time.monotonic()
+    try:
+        with open(path, "w", newline="", encoding="utf-8-sig") as file:
+            writer = utils.create_results_writer(file)
+            async for chunk in db.stream_results_by_test_id(test_id):
+                utils.write_results(writer, chunk)
+                exported += len(chunk)
+                if time.monotonic() - updated_at >= PROGRESS_INTERVAL:
+                    updated_at = time.monotonic()
+                    await progress.edit_text(
+                        text=lexicon.MESSAGES["export results"].format(
+                            exported=exported, total=max(total, exported)
+                        )
+                    )
+
+        await callback.message.answer_document(
+            document=FSInputFile(path, filename=f"test_{test_id}_results.csv"),
+            caption=lexicon.MESSAGES["export results done"].format(exported=exported),
+        )
+        await progress.delete()
+    finally:
+        os.remove(path)
+
+    # DEBUG LOG
+    logger.debug(
+        lexicon.LOGS["export results"].format(
+            admin_id=callback.from_user.id, count=exported, test_id=test_id
+        )
+    )
+
+
+@router.callback_query(
+    CallbackAction(QuestionCallback, "set_correct"), StateFilter(default_state)
+)
+async def call_edit_correct_answer(
+    callback: CallbackQuery, callback_data: QuestionCallback
+):
     """Edit correct answer"""
-    question_id = int(callback.data.split("_")[3])
-    answer_id = int(callback.data.split("_")[4])
-    db.change_correct_answer(question_id, answer_id)
-    question, answers = db.get_question_by_id(question_id)
+    question_id = callback_data.question_id
+    answer_id = callback_data.answer_id
+    await db.change_correct_answer(question_id, answer_id)
+    question, answers = await db.get_question_by_id(question_id)
     keyboard = kb.create_question_menu_keyboard(
+        question=question,
         answers=answers,
     )
 
@@ -168,17 +310,22 @@ async def call_edit_correct_answer(callback: CallbackQuery):
 
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"delete_question_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(QuestionCallback, "delete"), StateFilter(default_state)
 )
-async def call_delete_question(callback: CallbackQuery):
+async def call_delete_question(
+    callback: CallbackQuery, callback_data: QuestionCallback
+):
     """Delete question"""
-    question_id = int(callback.data.split("_")[2])
-    test = db.get_test_by_question_id(question_id)
-    db.delete_question_by_id(question_id)
+    question_id = callback_data.question_id
+    test = await db.get_test_by_question_id(question_id)
+    await image_store.release(
+        await db.delete_question_by_id(question_id),
+        db.get_image_keys,
+        config.images.gc_grace,
+    )
     keyboard = kb.create_test_menu_keyboard(
         test=test,
-        questions=db.get_questions_by_test_id(test.id),
+        count_questions=await db.get_count_questions_by_test_id(test.id),
         is_publish=test.is_publish,
     )
 
@@ -198,6 +345,17 @@ async def call_delete_question(callback: CallbackQuery):
     )
 
 
+@router.message(StateFilter(FSMImportTest.document))
+async def process_import_test_not_document(message: Message):
+    """Repeat import prompt for anything but a document"""
+    await message.answer(
+        text=lexicon.MESSAGES["import test"],
+        reply_markup=kb.create_back_button_keyboard(
+            callback_data="cancel import", mgs=lexicon.BUTTONS["cancel"]
+        ),
+    )
+
+
 # CREATE TEST
 
 
@@ -232,10 +390,9 @@ async def process_input_description(message: Message, state: FSMContext):
         )
     )
 
-    db.create_test(test["title"], test["description"])
-    utils.create_test_dir(db.get_tests()[0].id)
+    await db.create_test(test["title"], test["description"])
     keyboard = kb.create_tests_menu_keyboard(
-        tests=db.get_tests(),
+        page=await db.get_tests(),
         is_admin=True,
     )
     await message.answer(
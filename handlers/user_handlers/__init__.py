@@ -1,8 +1,12 @@
 from aiogram import Router
 
+from middlewares import UserMiddleware
 from . import navigation, process_testing
 
 router = Router()
 
+router.message.middleware(UserMiddleware())
+router.callback_query.middleware(UserMiddleware())
+
 router.include_router(navigation.router)
 router.include_router(process_testing.router)
@@ -1,5 +1,3 @@
-import re
-
 from aiogram import Router, F
 from aiogram.filters import CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
@@ -8,16 +6,18 @@ from aiogram.types import Message, CallbackQuery
 
 from config import lexicon
 from database import user_connect as db
+from database.pagination import Page
+from database.user_cache import UserRecord
 from handlers.user_handlers.states import FSMUserInputName
 from keyboard import keyboard_builder as kb
+from keyboard.callback_data import CallbackAction, TestCallback
 
 router = Router()
 
 
 @router.message(CommandStart(), StateFilter(default_state))
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, user: UserRecord | None):
     """Greeting user"""
-    user = db.get_user(message.from_user.id)
     if user:
         keyboard = kb.create_main_menu_keyboard(
             is_admin=False,
@@ -49,8 +49,10 @@ async def call_tests(callback: CallbackQuery):
     """Tests menu"""
     user_tg_id = callback.from_user.id
     keyboard = kb.create_tests_menu_keyboard(
-        tests=db.get_tests(
-            tg_id=user_tg_id,
+        page=Page(
+            items=await db.get_tests(
+                tg_id=user_tg_id,
+            )
         ),
         is_admin=False,
     )
@@ -61,16 +63,13 @@ async def call_tests(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(
-    lambda call: re.fullmatch(r"test_\d+", call.data),
-    StateFilter(default_state),
-)
-async def call_test(callback: CallbackQuery):
+@router.callback_query(CallbackAction(TestCallback, "view"), StateFilter(default_state))
+async def call_test(callback: CallbackQuery, callback_data: TestCallback):
     """Test menu"""
-    test_id = int(callback.data.split("_")[1])
-    test = db.get_test(test_id)
+    test_id = callback_data.test_id
+    test = await db.get_test(test_id)
     keyboard = kb.create_confirm_keyboard(
-        callback_yes=f"start_test_{test_id}",
+        callback_yes=TestCallback(action="start", test_id=test_id).pack(),
         callback_no="tests",
         text_yes=lexicon.BUTTONS["test yes"],
         text_no=lexicon.BUTTONS["test no"],
@@ -90,6 +89,7 @@ async def call_test(callback: CallbackQuery):
 async def process_input_name(message: Message, state: FSMContext):
     """Create user. Name and surname."""
     name, surname = message.text.title().split()
+    await db.create_user(message.from_user.id, name, surname)
     keyboard = kb.create_main_menu_keyboard(
         is_admin=False,
     )
@@ -1,48 +1,107 @@
-import re
+import asyncio
 
-from aiogram import Router, F
-from aiogram.filters import StateFilter
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state
-from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.types import (
+    BufferedInputFile,
+    CallbackQuery,
+    InlineKeyboardMarkup,
+    Message,
+)
 
 from handlers.user_handlers.states import FSMTesting
 from database import user_connect as db
+from database.result_queue import result_queue
+from database.snapshot import QuestionSnapshot
+from database.user_cache import UserRecord
 from keyboard import keyboard_builder as kb
+from keyboard.callback_data import AnswerCallback, CallbackAction, TestCallback
 from config import lexicon, config
+from utils import user_utils as utils
+from utils.image_store import image_store
 
 router = Router()
 
+# Question id -> file_id of the image upload in progress, None if it failed
+uploads: dict[int, asyncio.Future[str | None]] = {}
+
+
+async def answer_question_photo(
+    message: Message,
+    test_id: int,
+    question: QuestionSnapshot,
+    keyboard: InlineKeyboardMarkup,
+) -> None:
+    """Send question with image by Telegram file_id, uploading it only once"""
+    file_id = question.file_id
+    if file_id is None and question.id in uploads:
+        file_id = await asyncio.shield(uploads[question.id])
+    if file_id:
+        try:
+            await message.answer_photo(
+                photo=file_id,
+                caption=question.text,
+                reply_markup=keyboard,
+            )
+            return
+        except TelegramBadRequest:
+            pass
+
+    uploading = asyncio.get_running_loop().create_future()
+    uploads[question.id] = uploading
+    file_id = None
+    try:
+        sent = await message.answer_photo(
+            photo=BufferedInputFile(
+                await image_store.get(question.image), filename=question.image
+            ),
+            caption=question.text,
+            reply_markup=keyboard,
+        )
+        file_id = sent.photo[-1].file_id
+        await db.set_question_file_id(test_id, question.id, file_id)
+    finally:
+        uploading.set_result(file_id)
+        if uploads.get(question.id) is uploading:
+            del uploads[question.id]
+
 
 @router.callback_query(
-    lambda call: re.fullmatch(r"start_test_\d+", call.data),
-    StateFilter(default_state),
+    CallbackAction(TestCallback, "start"), StateFilter(default_state)
 )
 async def call_start_test(
     callback: CallbackQuery,
     state: FSMContext,
+    callback_data: TestCallback,
 ):
     """Start test"""
+    test_id = callback_data.test_id
+    try:
+        snapshot = await db.get_test_snapshot(test_id)
+    except LookupError:
+        snapshot = None
+    if snapshot is None or not snapshot.questions:
+        # Stale button of a deleted test
+        await callback.message.edit_text(
+            text=lexicon.MESSAGES["test unavailable"],
+            reply_markup=kb.create_main_menu_keyboard(is_admin=False),
+        )
+        await callback.answer()
+        return
     await state.set_state(FSMTesting.testing)
-    test_id = int(callback.data.split("_")[2])
-    await state.update_data(test_id=test_id)
-    questions = db.get_questions(test_id)
-    await state.update_data(questions=questions)
-    await state.update_data(result={})
-    question = questions.pop(0)
-    await state.update_data(question_id=question.id)
-    answers = db.get_answers_by_question_id(question.id)
-    await state.update_data(answers=answers)
+    data = utils.create_attempt(snapshot, shuffle_questions=config.shuffle_questions)
+    await state.set_data(data)
+    question = snapshot.get_question(data["question_ids"][0])
     keyboard = kb.create_test_answers_keyboard(
-        answers=answers,
+        snapshot=snapshot,
+        question=question,
+        answers=utils.get_answers(data, question),
     )
     if question.image:
-        image = FSInputFile(f"img/test_{test_id}/{question.image}")
-        await callback.message.answer_photo(
-            photo=image,
-            caption=question.text,
-            reply_markup=keyboard,
-        )
+        await answer_question_photo(callback.message, test_id, question, keyboard)
         await callback.message.delete()
     else:
         await callback.message.edit_text(
@@ -52,31 +111,52 @@ async def call_start_test(
     await callback.answer()
 
 
-@router.callback_query(F.data, StateFilter(FSMTesting.testing))
-async def call_answering(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CallbackAction(AnswerCallback), StateFilter(FSMTesting.testing))
+async def call_answering(
+    callback: CallbackQuery,
+    state: FSMContext,
+    callback_data: AnswerCallback,
+    user: UserRecord | None,
+):
     """Process testing"""
+    question_id, answer_id = callback_data.question_id, callback_data.answer_id
     data = await state.get_data()
-    result = data["result"]
-    answer = db.get_answer_by_id(callback.data)
-    if answer.is_correct:
-        result[data["question_id"]] = {answer.id: True}
-    else:
-        result[data["question_id"]] = {answer.id: False}
+    try:
+        question_ids = data["question_ids"]
+        if question_ids[data["position"]] != question_id:
+            # Answer to a question that is already answered
+            await callback.answer()
+            return
+        snapshot = await db.get_test_snapshot(data["test_id"])
+        question = snapshot.get_question(question_id)
+        answer = question.get_answer(answer_id)
+    except LookupError:
+        # No attempt in the state, its test was deleted or the answer is unknown
+        await state.clear()
+        await callback.message.answer(
+            text=lexicon.MESSAGES["test unavailable"],
+            reply_markup=kb.create_main_menu_keyboard(is_admin=False),
+        )
+        await callback.message.delete()
+        await callback.answer()
+        return
+    data.update(utils.record_answer(data, question, answer))
 
-    if data["questions"]:
-        question = data["questions"].pop(0)
-        await state.update_data(question_id=question.id)
-        answers = db.get_answers_by_question_id(question.id)
-        await state.update_data(answers=answers)
+    if data["position"] < len(question_ids):
+        await state.update_data(
+            position=data["position"],
+            correct=data["correct"],
+            choices=data["choices"],
+        )
+        question = snapshot.get_question(question_ids[data["position"]])
         keyboard = kb.create_test_answers_keyboard(
-            answers=answers,
+            snapshot=snapshot,
+            question=question,
+            answers=utils.get_answers(data, question),
         )
         if question.image:
-            image = FSInputFile(f"img/test_{data['test_id']}/{question.image}")
-            await callback.message.answer_photo(
-                photo=image,
-                caption=question.text,
-                reply_markup=keyboard,
+            await answer_question_photo(
+                callback.message, data["test_id"], question, keyboard
             )
             await callback.message.delete()
         else:
@@ -86,10 +166,14 @@ async def call_answering(callback: CallbackQuery, state: FSMContext):
             )
             await callback.message.delete()
     else:
-        score = db.save_result(
-            user_id=db.get_user(callback.from_user.id).id,
-            test_id=data["test_id"],
-            result=result,
+        score = utils.get_score(data)
+        result_queue.put(
+            db.NewResult(
+                user_id=user.id,
+                test_id=data["test_id"],
+                score=score,
+                incorrect_answers=utils.get_incorrect_answers(data, snapshot),
+            )
         )
         await state.clear()
         await state.set_state(default_state)
@@ -104,3 +188,32 @@ async def call_answering(callback: CallbackQuery, state: FSMContext):
         )
         await callback.message.delete()
     await callback.answer()
+
+
+@router.message(CommandStart(), StateFilter(FSMTesting.testing))
+async def cmd_resume_test(message: Message, state: FSMContext):
+    """Resend current question of unfinished test with the same answer order"""
+    data = await state.get_data()
+    try:
+        snapshot = await db.get_test_snapshot(data["test_id"])
+        question = snapshot.get_question(data["question_ids"][data["position"]])
+    except LookupError:
+        # No attempt in the state, or its test or question was deleted
+        await state.clear()
+        await message.answer(
+            text=lexicon.MESSAGES["test unavailable"],
+            reply_markup=kb.create_main_menu_keyboard(is_admin=False),
+        )
+        return
+    keyboard = kb.create_test_answers_keyboard(
+        snapshot=snapshot,
+        question=question,
+        answers=utils.get_answers(data, question),
+    )
+    if question.image:
+        await answer_question_photo(message, data["test_id"], question, keyboard)
+    else:
+        await message.answer(
+            text=question.text,
+            reply_markup=keyboard,
+        )
@@ -0,0 +1,78 @@
+"""
+The keyboard cache module.
+
+Inline keyboards are immutable, so one markup object can be sent to any
+number of users. Builders of menus that do not depend on a database page
+look their markup up here first and build it only on a miss. Keys start
+with the kind of the keyboard and the lexicon language; keyboards of a
+test also hold the test version, so a keyboard built before the test was
+changed is never found again and is evicted as least recently used.
+
+Classes:
+    KeyboardCache - LRU cache of built keyboards.
+
+Objects:
+    keyboard_cache - shared cache instance.
+"""
+
+from collections import OrderedDict
+from typing import Hashable
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import config
+
+# Keyboards kept built
+KEYBOARD_CACHE_SIZE = 4096
+
+
+class KeyboardCache:
+    """
+    LRU cache of built keyboards.
+
+    Attributes:
+        max_size: int - number of keyboards kept
+        hits: int - number of lookups that found a keyboard
+        misses: int - number of lookups that did not
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._keyboards: OrderedDict[tuple, InlineKeyboardMarkup] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[Hashable, ...]) -> InlineKeyboardMarkup | None:
+        """Returns the keyboard built for key, None on a miss."""
+        key = (config.language, *key)
+        keyboard = self._keyboards.get(key)
+        if keyboard is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._keyboards.move_to_end(key)
+        return keyboard
+
+    def put(
+        self, key: tuple[Hashable, ...], keyboard: InlineKeyboardMarkup
+    ) -> InlineKeyboardMarkup:
+        """Stores the keyboard built for key and returns it."""
+        self._keyboards[(config.language, *key)] = keyboard
+        if len(self._keyboards) > self.max_size:
+            self._keyboards.popitem(last=False)
+        return keyboard
+
+    def clear(self) -> None:
+        """Drops all keyboards."""
+        self._keyboards.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the size, hits and misses of the cache."""
+        return {
+            "size": len(self._keyboards),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+keyboard_cache = KeyboardCache(KEYBOARD_CACHE_SIZE)
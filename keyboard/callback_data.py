@@ -0,0 +1,174 @@
+"""
+The callback data module.
+
+Typed callback data of inline buttons. Keyboards pack it, and handlers
+match it with the CallbackAction filter: the data string is split at the
+prefix, looked up in a table of factories and parsed once, so every
+further filter only compares the parsed object instead of running a
+regular expression.
+
+Classes:
+    PageCallback - page of the tests or users list.
+    TestCallback - action on a test.
+    QuestionCallback - action on a question.
+    UserCallback - page of the results of a user.
+    ResultCallback - result of a user.
+    AnswerCallback - answer of an examinee to a question.
+    CallbackAction - filter of callback queries by factory and action.
+
+Functions:
+    parse_callback_data:
+        Parses callback data into the object of its factory.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+from aiogram.filters import Filter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+from pydantic import ValidationError
+
+# Distinct callback data strings kept parsed
+PARSED_CACHE_SIZE = 4096
+
+
+class PageCallback(CallbackData, prefix="page"):
+    """
+    Page of the tests or users list.
+
+    Attributes:
+        action: str - tests or users, the list to page
+        before: int | None - keyset cursor of the previous page
+        after: int | None - keyset cursor of the next page
+    """
+
+    action: str
+    before: int | None = None
+    after: int | None = None
+
+
+class TestCallback(CallbackData, prefix="test"):
+    """
+    Action on a test.
+
+    Attributes:
+        action: str - open, view, start, questions, add_question,
+            confirm_publish, publish, confirm_delete, delete, analytics
+            or export
+        test_id: int - id of the test
+        before: int | None - keyset cursor of the previous questions page
+        after: int | None - keyset cursor of the next questions page
+    """
+
+    action: str
+    test_id: int
+    before: int | None = None
+    after: int | None = None
+
+
+class QuestionCallback(CallbackData, prefix="question"):
+    """
+    Action on a question.
+
+    Attributes:
+        action: str - open, edit, set_correct or delete
+        question_id: int - id of the question
+        answer_id: int | None - id of the answer to make correct
+    """
+
+    action: str
+    question_id: int
+    answer_id: int | None = None
+
+
+class UserCallback(CallbackData, prefix="user"):
+    """
+    Page of the results of a user.
+
+    Attributes:
+        user_id: int - id of the user
+        before: int | None - keyset cursor of the previous page
+        after: int | None - keyset cursor of the next page
+    """
+
+    user_id: int
+    before: int | None = None
+    after: int | None = None
+
+
+class ResultCallback(CallbackData, prefix="result"):
+    """
+    Result of a user.
+
+    Attributes:
+        result_id: int - id of the result
+    """
+
+    result_id: int
+
+
+class AnswerCallback(CallbackData, prefix="answer"):
+    """
+    Answer of an examinee to a question.
+
+    Attributes:
+        question_id: int - id of the question
+        answer_id: int - id of the chosen answer
+    """
+
+    question_id: int
+    answer_id: int
+
+
+FACTORIES: dict[str, type[CallbackData]] = {
+    factory.__prefix__: factory
+    for factory in (
+        PageCallback,
+        TestCallback,
+        QuestionCallback,
+        UserCallback,
+        ResultCallback,
+        AnswerCallback,
+    )
+}
+
+
+@lru_cache(maxsize=PARSED_CACHE_SIZE)
+def parse_callback_data(data: str) -> CallbackData | None:
+    """
+    Parses callback data into the object of its factory.
+
+    Returns None for data of no factory, such as menu buttons.
+    """
+    factory = FACTORIES.get(data.partition(":")[0])
+    if factory is None:
+        return None
+    try:
+        return factory.unpack(data)
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+class CallbackAction(Filter):
+    """
+    Filter of callback queries by factory and action.
+
+    Passes the parsed object to the handler as callback_data.
+
+    Attributes:
+        factory: type[CallbackData] - factory of the callback data
+        actions: frozenset[str] - accepted actions, any if empty
+    """
+
+    def __init__(self, factory: type[CallbackData], *actions: str) -> None:
+        self.factory = factory
+        self.actions = frozenset(actions)
+
+    async def __call__(self, callback: CallbackQuery) -> bool | dict[str, Any]:
+        callback_data = parse_callback_data(callback.data or "")
+        if type(callback_data) is not self.factory:
+            return False
+        if self.actions and callback_data.action not in self.actions:
+            return False
+        return {"callback_data": callback_data}
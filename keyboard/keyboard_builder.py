@@ -1,21 +1,58 @@
-from random import shuffle
-
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from config import config, lexicon
 from database.database import Question, Test, User, Answer
-from database.admin_connect import (
-    get_test_id_by_question_id,
-    get_count_results_by_user_id,
-    get_results_by_user_id,
-    get_test_by_id,
+from database.cache import test_cache
+from database.pagination import Page
+from database.snapshot import AnswerSnapshot, QuestionSnapshot, TestSnapshot
+from keyboard.cache import keyboard_cache
+from keyboard.callback_data import (
+    AnswerCallback,
+    PageCallback,
+    QuestionCallback,
+    ResultCallback,
+    TestCallback,
+    UserCallback,
 )
 
 
+def _add_page_row(
+    keyboard_builder: InlineKeyboardBuilder,
+    page: Page,
+    callback_data: CallbackData,
+) -> None:
+    """Add previous/next page buttons to keyboard."""
+    buttons = []
+    if page.prev_cursor is not None:
+        buttons.append(
+            InlineKeyboardButton(
+                text=lexicon.BUTTONS["previous page"],
+                callback_data=callback_data.model_copy(
+                    update={"before": page.prev_cursor}
+                ).pack(),
+            )
+        )
+    if page.next_cursor is not None:
+        buttons.append(
+            InlineKeyboardButton(
+                text=lexicon.BUTTONS["next page"],
+                callback_data=callback_data.model_copy(
+                    update={"after": page.next_cursor}
+                ).pack(),
+            )
+        )
+    if buttons:
+        keyboard_builder.row(*buttons)
+
+
 def create_main_menu_keyboard(
     is_admin: bool = False,
 ) -> InlineKeyboardMarkup:
+    key = ("main menu", is_admin)
+    if keyboard := keyboard_cache.get(key):
+        return keyboard
     keyboard_builder = InlineKeyboardBuilder()
     keyboard_builder.row(
         InlineKeyboardButton(text=lexicon.BUTTONS["tests"], callback_data="tests")
@@ -26,15 +63,15 @@ def create_main_menu_keyboard(
             InlineKeyboardButton(text=lexicon.BUTTONS["users"], callback_data="users")
         )
 
-    return keyboard_builder.as_markup()
+    return keyboard_cache.put(key, keyboard_builder.as_markup())
 
 
 def create_tests_menu_keyboard(
-    tests: list[Test],
+    page: Page[Test],
     is_admin: bool = False,
 ) -> InlineKeyboardMarkup:
     keyboard_builder = InlineKeyboardBuilder()
-    for test in tests:
+    for test in page.items:
         keyboard_builder.row(
             InlineKeyboardButton(
                 text=(
@@ -42,9 +79,12 @@ def create_tests_menu_keyboard(
                     if is_admin
                     else f"{test.title}"
                 ),
-                callback_data=f"test {test.id}",
+                callback_data=TestCallback(
+                    action="open" if is_admin else "view", test_id=test.id
+                ).pack(),
             )
         )
+    _add_page_row(keyboard_builder, page, PageCallback(action="tests"))
 
     if is_admin:
         keyboard_builder.row(
@@ -52,6 +92,11 @@ def create_tests_menu_keyboard(
                 text=lexicon.BUTTONS["add test"], callback_data="add test"
             )
         )
+        keyboard_builder.row(
+            InlineKeyboardButton(
+                text=lexicon.BUTTONS["import test"], callback_data="import test"
+            )
+        )
 
     keyboard_builder.row(
         InlineKeyboardButton(text=lexicon.BUTTONS["back"], callback_data="main menu")
@@ -62,55 +107,85 @@ def create_tests_menu_keyboard(
 
 def create_test_menu_keyboard(
     test: Test,
-    questions: list[Question],
+    count_questions: int,
     is_publish: bool,
 ) -> InlineKeyboardMarkup:
     """Create test menu keyboard."""
+    key = ("test menu", test.id, count_questions, is_publish)
+    if keyboard := keyboard_cache.get(key):
+        return keyboard
     keyboard_builder = InlineKeyboardBuilder()
     if not is_publish:
         keyboard_builder.row(
             InlineKeyboardButton(
-                text=lexicon.BUTTONS["view questions"].format(
-                    count=len(questions) if questions else 0
-                ),
+                text=lexicon.BUTTONS["view questions"].format(count=count_questions),
                 # todo: создать хендлер для получения вопросов
-                callback_data=f"test_questions_{test.id}",
+                callback_data=TestCallback(
+                    action="questions", test_id=test.id
+                ).pack(),
             )
         )
         keyboard_builder.row(
             InlineKeyboardButton(
                 text=lexicon.BUTTONS["add question"],
-                callback_data=f"add_question_test_{test.id}",
+                callback_data=TestCallback(
+                    action="add_question", test_id=test.id
+                ).pack(),
             )
         )
         keyboard_builder.row(
             InlineKeyboardButton(
                 text=lexicon.BUTTONS["publish test"],
-                callback_data=f"confirm_publish_test_{test.id}",
+                callback_data=TestCallback(
+                    action="confirm_publish", test_id=test.id
+                ).pack(),
+            )
+        )
+    else:
+        keyboard_builder.row(
+            InlineKeyboardButton(
+                text=lexicon.BUTTONS["test analytics"],
+                callback_data=TestCallback(action="analytics", test_id=test.id).pack(),
+            )
+        )
+        keyboard_builder.row(
+            InlineKeyboardButton(
+                text=lexicon.BUTTONS["export results"],
+                callback_data=TestCallback(action="export", test_id=test.id).pack(),
             )
         )
     keyboard_builder.row(
         InlineKeyboardButton(
             text=lexicon.BUTTONS["delete test"],
-            callback_data=f"confirm_delete_test_{test.id}",
+            callback_data=TestCallback(
+                action="confirm_delete", test_id=test.id
+            ).pack(),
         )
     )
     keyboard_builder.row(
         InlineKeyboardButton(text=lexicon.BUTTONS["back"], callback_data="tests")
     )
-    return keyboard_builder.as_markup()
+    return keyboard_cache.put(key, keyboard_builder.as_markup())
 
 
-def create_questions_menu_keyboard(questions: list[Question]) -> InlineKeyboardMarkup:
+def create_questions_menu_keyboard(
+    page: Page[Question],
+    test_id: int,
+) -> InlineKeyboardMarkup:
     """Create questions menu keyboard."""
     keyboard_builder = InlineKeyboardBuilder()
-    for question in questions:
+    for question in page.items:
         keyboard_builder.row(
             InlineKeyboardButton(
                 text=f"{question.text}",
-                callback_data=f"question_{question.id}",
+                callback_data=QuestionCallback(
+                    action="open", question_id=question.id
+                ).pack(),
             )
         )
+    _add_page_row(
+        keyboard_builder, page, TestCallback(action="questions", test_id=test_id)
+    )
     keyboard_builder.row(
         InlineKeyboardButton(text=lexicon.BUTTONS["back"], callback_data="tests")
     )
@@ -131,17 +206,31 @@ def create_choice_answer_keyboard(
 
 
 def create_test_answers_keyboard(
-    answers: list[Answer],
+    snapshot: TestSnapshot,
+    question: QuestionSnapshot,
+    answers: list[AnswerSnapshot],
 ) -> InlineKeyboardMarkup:
-    """Create test answers keyboard."""
+    """Create test answers keyboard with answers in the given order."""
+    key = (
+        "test answers",
+        snapshot.id,
+        snapshot.version,
+        question.id,
+        *(answer.id for answer in answers),
+    )
+    if keyboard := keyboard_cache.get(key):
+        return keyboard
     keyboard_builder = InlineKeyboardBuilder()
-
-    shuffle(answers)
     for answer in answers:
         keyboard_builder.row(
-            InlineKeyboardButton(text=f"{answer.text}", callback_data=f"{answer.id}")
+            InlineKeyboardButton(
+                text=f"{answer.text}",
+                callback_data=AnswerCallback(
+                    question_id=question.id, answer_id=answer.id
+                ).pack(),
+            )
         )
-    return keyboard_builder.as_markup()
+    return keyboard_cache.put(key, keyboard_builder.as_markup())
 
 
 def create_confirm_keyboard(
@@ -151,39 +240,49 @@ def create_confirm_keyboard(
     text_no: str = lexicon.BUTTONS["no"],
 ) -> InlineKeyboardMarkup:
     """Create confirm keyboard."""
+    key = ("confirm", callback_yes, callback_no, text_yes, text_no)
+    if keyboard := keyboard_cache.get(key):
+        return keyboard
     keyboard_builder = InlineKeyboardBuilder()
     keyboard_builder.row(
         InlineKeyboardButton(text=text_yes, callback_data=callback_yes),
         InlineKeyboardButton(text=text_no, callback_data=callback_no),
     )
-    return keyboard_builder.as_markup()
+    return keyboard_cache.put(key, keyboard_builder.as_markup())
 
 
 def create_after_test_keyboard() -> InlineKeyboardMarkup:
     """Create after test keyboard."""
+    key = ("after test",)
+    if keyboard := keyboard_cache.get(key):
+        return keyboard
     keyboard_builder = InlineKeyboardBuilder()
     keyboard_builder.row(
         InlineKeyboardButton(
             text=lexicon.BUTTONS["main menu"], callback_data="main_menu"
         ),
     )
-    return keyboard_builder.as_markup()
+    return keyboard_cache.put(key, keyboard_builder.as_markup())
 
 
-def create_users_menu_keyboard(users: list[User]) -> InlineKeyboardMarkup:
+def create_users_menu_keyboard(
+    page: Page[User],
+    completed: dict[int, int],
+    total: int,
+) -> InlineKeyboardMarkup:
     """Create users menu keyboard."""
     keyboard_builder = InlineKeyboardBuilder()
-    for user in users:
-        result = get_count_results_by_user_id(user.id)
+    for user in page.items:
         keyboard_builder.row(
             InlineKeyboardButton(
                 text=(
                     f"{user.name} {user.surname}"
-                    f" {result['completed']}/{result['total']}"
+                    f" {completed.get(user.id, 0)}/{total}"
                 ),
-                callback_data=f"user {user.id}",
+                callback_data=UserCallback(user_id=user.id).pack(),
             )
         )
+    _add_page_row(keyboard_builder, page, PageCallback(action="users"))
     keyboard_builder.row(
         InlineKeyboardButton(text=lexicon.BUTTONS["back"], callback_data="main menu")
     )
@@ -191,22 +290,22 @@ def create_users_menu_keyboard(users: list[User]) -> InlineKeyboardMarkup:
 
 
 def create_user_menu_keyboard(
-    user: User,
+    page: Page[tuple[int, int, str]],
+    user_id: int,
 ) -> InlineKeyboardMarkup:
     """Create user menu keyboard."""
-    keyboard_builder = InlineKeyboardBuilder()  # todo: Добавить функционал
-    results = get_results_by_user_id(user_id=user.id)
-    for result in results:
-        test = get_test_by_id(result.test_id)
+    keyboard_builder = InlineKeyboardBuilder()
+    for result_id, score, title in page.items:
         keyboard_builder.row(
             InlineKeyboardButton(
                 text=(
-                    f"{'✅' if result.score >= config.pass_score else '❌'}"
-                    f" {test.title} - {result.score}"
+                    f"{'✅' if score >= config.pass_score else '❌'}"
+                    f" {title} - {score}"
                 ),
-                callback_data=f"result_{result.id}",
+                callback_data=ResultCallback(result_id=result_id).pack(),
             )
         )
+    _add_page_row(keyboard_builder, page, UserCallback(user_id=user_id))
     keyboard_builder.row(
         InlineKeyboardButton(text=lexicon.BUTTONS["back"], callback_data="users")
     )
@@ -214,38 +313,57 @@ def create_user_menu_keyboard(
 
 
 def create_question_menu_keyboard(
+    question: Question,
     answers: list[Answer],
 ) -> InlineKeyboardMarkup:
     """Create question menu keyboard."""
+    # The answers may change between loading them and reading the version
+    key = (
+        "question menu",
+        question.test_id,
+        test_cache.version(question.test_id),
+        question.id,
+        *(answer.id for answer in answers if answer.is_correct),
+    )
+    if keyboard := keyboard_cache.get(key):
+        return keyboard
     keyboard_builder = InlineKeyboardBuilder()
     for answer in answers:
         keyboard_builder.row(
             InlineKeyboardButton(
                 text=f"{'✅' if answer.is_correct else ''} {answer.text}",
-                callback_data=(f"edit_correct_answer_{answer.question_id}_{answer.id}"),
+                callback_data=QuestionCallback(
+                    action="set_correct",
+                    question_id=answer.question_id,
+                    answer_id=answer.id,
+                ).pack(),
             )
         )
     keyboard_builder.row(
         InlineKeyboardButton(
             text=lexicon.BUTTONS["edit question"],
-            callback_data=f"edit_question_{answers[0].question_id}",
+            callback_data=QuestionCallback(
+                action="edit", question_id=question.id
+            ).pack(),
         ),
     )
     keyboard_builder.row(
         InlineKeyboardButton(
             text=lexicon.BUTTONS["delete question"],
-            callback_data=f"delete_question_{answers[0].question_id}",
+            callback_data=QuestionCallback(
+                action="delete", question_id=question.id
+            ).pack(),
         ),
     )
     keyboard_builder.row(
         InlineKeyboardButton(
             text=lexicon.BUTTONS["back"],
-            callback_data=(
-                f"test {get_test_id_by_question_id(answers[0].question_id)}"
-            ),
+            callback_data=TestCallback(
+                action="open", test_id=question.test_id
+            ).pack(),
         )
     )
-    return keyboard_builder.as_markup()
+    return keyboard_cache.put(key, keyboard_builder.as_markup())
 
 
 def create_back_button_keyboard(
@@ -253,6 +371,9 @@ def create_back_button_keyboard(
     mgs: str = lexicon.BUTTONS["back"],
 ) -> InlineKeyboardMarkup:
     """Create back button keyboard."""
+    key = ("back", callback_data, mgs)
+    if keyboard := keyboard_cache.get(key):
+        return keyboard
     keyboard_builder = InlineKeyboardBuilder()
     keyboard_builder.row(InlineKeyboardButton(text=mgs, callback_data=callback_data))
-    return keyboard_builder.as_markup()
+    return keyboard_cache.put(key, keyboard_builder.as_markup())
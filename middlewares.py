@@ -0,0 +1,175 @@
+"""
+The middlewares module.
+
+The throttling and debounce middlewares are outer ones: they run for every
+update before routing, so updates they drop never reach FSM storage,
+handlers or the database. The user middleware is an inner one of the user
+router and runs only when one of its handlers is called.
+
+Classes:
+    ThrottlingMiddleware - per-user token bucket limiting updates.
+    AnswerDebounceMiddleware - drops repeated answers to the same question.
+    UserMiddleware - injects the registered user into handler data.
+
+Functions:
+    setup_middlewares:
+        Registers the middlewares on the dispatcher.
+"""
+
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import CallbackQuery, TelegramObject, User
+from loguru import logger
+
+from config import ThrottlingConfig, lexicon
+from database.user_connect import get_user_record
+from keyboard.callback_data import AnswerCallback, parse_callback_data
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+# Minimum number of tracked users before stale entries are pruned
+PRUNE_SIZE = 1024
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Per-user token bucket limiting updates.
+
+    Every user has a bucket of burst tokens refilled at rate tokens per
+    second; an update takes one token and is dropped when the bucket is
+    empty. A dropped callback query is answered so the button stops loading.
+
+    Attributes:
+        rate: float - tokens added to a bucket per second
+        burst: int - capacity of a bucket
+        dropped: int - number of dropped updates
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.dropped = 0
+        # tg_id -> tokens left and time of the last update
+        self._buckets: dict[int, tuple[float, float]] = {}
+        self._prune_size = PRUNE_SIZE
+
+    def _take(self, user_id: int, now: float) -> bool:
+        tokens, updated = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            return False
+        self._buckets[user_id] = (tokens - 1, now)
+        if len(self._buckets) >= self._prune_size:
+            self._prune(now)
+        return True
+
+    def _prune(self, now: float) -> None:
+        # A bucket idle long enough to refill is the same as a missing one
+        refill = self.burst / self.rate
+        self._buckets = {
+            user_id: bucket
+            for user_id, bucket in self._buckets.items()
+            if now - bucket[1] < refill
+        }
+        self._prune_size = max(PRUNE_SIZE, 2 * len(self._buckets))
+
+    async def __call__(
+        self, handler: Handler, event: TelegramObject, data: dict[str, Any]
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None or self._take(user.id, time.monotonic()):
+            return await handler(event, data)
+
+        self.dropped += 1
+
+        # DEBUG LOG
+        logger.debug(lexicon.LOGS["throttled"].format(user_id=user.id))
+
+        if isinstance(event, CallbackQuery):
+            await event.answer(lexicon.MESSAGES["too many requests"])
+
+
+class AnswerDebounceMiddleware(BaseMiddleware):
+    """
+    Drops repeated answers to the same question.
+
+    The first answer callback of a user to a question is handled; the others
+    arriving while it is handled or within ttl seconds after it are answered
+    and dropped, so a double tap neither repeats the work nor answers the
+    next question. An answer whose handler fails or is cancelled can be sent
+    again.
+
+    Attributes:
+        ttl: float - seconds repeated answers are dropped after the first one
+        dropped: int - number of dropped answers
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.dropped = 0
+        # (tg_id, question_id) -> time until repeated answers are dropped
+        self._answered: dict[tuple[int, int], float] = {}
+        self._prune_size = PRUNE_SIZE
+
+    def _prune(self, now: float) -> None:
+        self._answered = {
+            key: until for key, until in self._answered.items() if until > now
+        }
+        self._prune_size = max(PRUNE_SIZE, 2 * len(self._answered))
+
+    async def __call__(
+        self, handler: Handler, event: CallbackQuery, data: dict[str, Any]
+    ) -> Any:
+        callback_data = parse_callback_data(event.data or "")
+        if not isinstance(callback_data, AnswerCallback):
+            return await handler(event, data)
+
+        key = (event.from_user.id, callback_data.question_id)
+        now = time.monotonic()
+        if self._answered.get(key, 0) > now:
+            self.dropped += 1
+            await event.answer()
+            return None
+
+        # Until the handler finishes the answer is treated as in progress
+        self._answered[key] = float("inf")
+        if len(self._answered) >= self._prune_size:
+            self._prune(now)
+        try:
+            result = await handler(event, data)
+        except BaseException:
+            # Also on cancellation, which is not an Exception
+            del self._answered[key]
+            raise
+        self._answered[key] = time.monotonic() + self.ttl
+        return result
+
+
+class UserMiddleware(BaseMiddleware):
+    """
+    Injects the registered user into handler data.
+
+    Handlers get the user as the user argument: a UserRecord from the user
+    cache, or None if the user is not registered.
+    """
+
+    async def __call__(
+        self, handler: Handler, event: TelegramObject, data: dict[str, Any]
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        data["user"] = None if user is None else await get_user_record(user.id)
+        return await handler(event, data)
+
+
+def setup_middlewares(dispatcher: Dispatcher, throttling: ThrottlingConfig) -> None:
+    """Registers the middlewares on the dispatcher."""
+    if throttling.rate > 0:
+        middleware = ThrottlingMiddleware(throttling.rate, throttling.burst)
+        dispatcher.message.outer_middleware(middleware)
+        dispatcher.callback_query.outer_middleware(middleware)
+    dispatcher.callback_query.outer_middleware(
+        AnswerDebounceMiddleware(throttling.answer_debounce)
+    )
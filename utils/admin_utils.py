@@ -2,46 +2,81 @@
 Утилиты для администратора.
 
 Функции:
-    create_test_dir:
-        Создание директории теста для изображений.
-    delete_test_dir:
-        Удаление директории теста для изображений.
-    get_next_number_image:
-        Получение следующего номера изображения.
+    create_results_file:
+        Создание временного файла выгрузки результатов.
+    create_results_writer:
+        Создание CSV-писателя результатов с заголовком.
+    write_results:
+        Запись пачки результатов в CSV.
 """
 
+import csv
 import os
-import shutil
+import tempfile
+from typing import TextIO
 
+from config import config
+from database.admin_connect import ExportedResult
 
-def create_test_dir(test_id: int) -> None:
+RESULTS_HEADER = (
+    "result_id",
+    "name",
+    "surname",
+    "score",
+    "passed",
+    "incorrect_answers",
+)
+
+
+def create_results_file(test_id: int) -> str:
     """
-    Создание директории теста для изображений.
+    Создание временного файла выгрузки результатов.
 
     Args:
         test_id: ID теста.
+
+    Returns:
+        Путь к файлу.
     """
-    if not os.path.exists("img"):
-        os.mkdir("img")
-    if not os.path.exists(f"img/test_{test_id}"):
-        os.mkdir(f"img/test_{test_id}")
+    descriptor, path = tempfile.mkstemp(prefix=f"test_{test_id}_", suffix=".csv")
+    os.close(descriptor)
+    return path
 
 
-def delete_test_dir(test_id: int) -> None:
+def create_results_writer(file: TextIO):
     """
-    Удаление директории теста для изображений.
+    Создание CSV-писателя результатов с заголовком.
 
     Args:
-        test_id: ID теста.
+        file: Файл, открытый на запись с newline="".
     """
-    if os.path.exists(f"img/test_{test_id}"):
-        shutil.rmtree(f"img/test_{test_id}")
+    writer = csv.writer(file)
+    writer.writerow(RESULTS_HEADER)
+    return writer
 
 
-def get_next_number_image(test_id: int) -> int:
-    """Получение следующего номера изображения.
+def write_results(writer, results: list[ExportedResult]) -> None:
+    """
+    Запись пачки результатов в CSV.
+
+    Неправильные ответы записываются в одну ячейку в виде
+    "вопрос: ответ", разделенных " | ".
 
     Args:
-        test_id: ID теста.
+        writer: CSV-писатель.
+        results: Результаты теста.
     """
-    return len(os.listdir(f"img/test_{test_id}")) + 1
+    writer.writerows(
+        (
+            result.result_id,
+            result.name,
+            result.surname,
+            result.score,
+            int(result.score >= config.pass_score),
+            " | ".join(
+                f"{question}: {answer}"
+                for question, answer in result.incorrect_answers
+            ),
+        )
+        for result in results
+    )
@@ -0,0 +1,454 @@
+"""
+Хранилище изображений вопросов.
+
+Изображения хранятся по содержимому: ключ изображения - SHA-256 его байтов,
+поэтому одинаковые изображения разных вопросов и тестов хранятся один раз.
+Вопрос ссылается на изображение ключом в Question.image, а количество
+ссылок считается по строкам вопросов. Изображение удаляется, когда
+удален последний ссылающийся на него вопрос, а изображения без ссылок,
+оставшиеся после сбоев, удаляет сборка мусора.
+
+Повторное сохранение изображения обновляет время его сохранения. И при
+удалении вопроса, и при сборке мусора изображения моложе IMAGE_GC_GRACE
+секунд не удаляются: вопрос с ними может создаваться прямо сейчас.
+
+Бэкенд выбирается настройкой IMAGE_STORE: local - папка IMAGE_STORE_PATH,
+s3 - бакет S3-совместимого хранилища (например, MinIO).
+
+Запуск из корня репозитория:
+    python -m utils.image_store gc  - сборка мусора
+
+Классы:
+    ImageBackend - интерфейс бэкенда хранилища.
+    LocalImageBackend - бэкенд в локальной папке.
+    S3ImageBackend - бэкенд в S3-совместимом хранилище.
+    ImageStore - хранилище изображений по содержимому.
+
+Функции:
+    get_key:
+        Получение ключа изображения по содержимому.
+    create_image_store:
+        Создание хранилища изображений по настройкам.
+
+Объекты:
+    image_store - общий экземпляр хранилища.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import sys
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+from aiohttp import ClientSession
+
+from config import ImageStoreConfig, config
+
+KEY_PATTERN = re.compile(r"[0-9a-f]{64}\.jpg")
+
+
+def get_key(data: bytes) -> str:
+    """
+    Получение ключа изображения по содержимому.
+
+    Args:
+        data: Содержимое изображения.
+    """
+    return f"{hashlib.sha256(data).hexdigest()}.jpg"
+
+
+class ImageBackend(ABC):
+    """Интерфейс бэкенда хранилища."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        """Сохранение изображения или обновление времени его сохранения."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Получение изображения."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Удаление изображения, если оно есть."""
+
+    @abstractmethod
+    def list(self) -> AsyncIterator[tuple[str, datetime]]:
+        """Перебор ключей изображений и времени их сохранения."""
+
+    @abstractmethod
+    async def modified(self, key: str) -> datetime | None:
+        """Получение времени сохранения изображения, None, если его нет."""
+
+    async def close(self) -> None:
+        """Освобождение ресурсов бэкенда."""
+
+
+class LocalImageBackend(ImageBackend):
+    """
+    Бэкенд в локальной папке.
+
+    Изображения раскладываются по подпапкам по первым двум символам ключа.
+
+    root: str - папка хранилища.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        try:
+            # Изображение уже есть: продлевается его защита от сборки мусора
+            os.utime(path)
+            return
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    def _read(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as file:
+            return file.read()
+
+    def _remove(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _modified(self, key: str) -> datetime | None:
+        try:
+            modified = os.path.getmtime(self._path(key))
+        except FileNotFoundError:
+            return None
+        return datetime.fromtimestamp(modified, timezone.utc)
+
+    def _scan(self) -> list[tuple[str, datetime]]:
+        if not os.path.isdir(self.root):
+            return []
+        keys = []
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if not re.fullmatch(r"[0-9a-f]{2}", prefix) or not os.path.isdir(directory):
+                continue
+            for key in os.listdir(directory):
+                if KEY_PATTERN.fullmatch(key):
+                    modified = os.path.getmtime(os.path.join(directory, key))
+                    keys.append(
+                        (key, datetime.fromtimestamp(modified, timezone.utc))
+                    )
+        return keys
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, key, data)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._remove, key)
+
+    async def list(self) -> AsyncIterator[tuple[str, datetime]]:
+        for item in await asyncio.to_thread(self._scan):
+            yield item
+
+    async def modified(self, key: str) -> datetime | None:
+        return await asyncio.to_thread(self._modified, key)
+
+
+class S3ImageBackend(ImageBackend):
+    """
+    Бэкенд в S3-совместимом хранилище.
+
+    Запросы подписываются AWS Signature Version 4 и отправляются по адресам
+    вида {url}/{bucket}/{key}, которые поддерживают и AWS S3, и MinIO.
+
+    url: str - адрес хранилища.
+    bucket: str - бакет.
+    access_key: str - ключ доступа.
+    secret_key: str - секретный ключ.
+    region: str - регион.
+    """
+
+    def __init__(
+        self, url: str, bucket: str, access_key: str, secret_key: str, region: str
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self._session: ClientSession | None = None
+
+    def _sign(
+        self, method: str, path: str, query: dict[str, str], payload: bytes
+    ) -> tuple[str, dict[str, str]]:
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+        payload_hash = hashlib.sha256(payload).hexdigest()
+        host = self.url.split("://", 1)[-1]
+        canonical_query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted(query.items())
+        )
+        headers = {
+            "host": host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+        }
+        signed_headers = ";".join(headers)
+        canonical_request = "\n".join(
+            (
+                method,
+                quote(path, safe="/-_.~"),
+                canonical_query,
+                "".join(f"{name}:{value}\n" for name, value in headers.items()),
+                signed_headers,
+                payload_hash,
+            )
+        )
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            (
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            )
+        )
+        key = f"AWS4{self.secret_key}".encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        del headers["host"]
+        url = self.url + quote(path, safe="/-_.~")
+        if canonical_query:
+            url += f"?{canonical_query}"
+        return url, headers
+
+    async def _request(
+        self,
+        method: str,
+        key: str = "",
+        query: dict[str, str] | None = None,
+        payload: bytes = b"",
+    ) -> tuple[int, bytes]:
+        if self._session is None:
+            self._session = ClientSession()
+        url, headers = self._sign(
+            method, f"/{self.bucket}/{key}", query or {}, payload
+        )
+        async with self._session.request(
+            method, url, headers=headers, data=payload or None
+        ) as response:
+            body = await response.read()
+            if response.status >= 300 and response.status != 404:
+                raise OSError(f"S3 {method} {key}: {response.status} {body[:200]!r}")
+            return response.status, body
+
+    async def put(self, key: str, data: bytes) -> None:
+        await self._request("PUT", key, payload=data)
+
+    async def get(self, key: str) -> bytes:
+        status, body = await self._request("GET", key)
+        if status == 404:
+            raise FileNotFoundError(key)
+        return body
+
+    async def delete(self, key: str) -> None:
+        await self._request("DELETE", key)
+
+    async def list(self, prefix: str = "") -> AsyncIterator[tuple[str, datetime]]:
+        namespace = {"s3": "http://s3.amazonaws.com/doc/2006-03-01/"}
+        query = {"list-type": "2", "prefix": prefix}
+        while True:
+            _, body = await self._request("GET", query=query)
+            root = ElementTree.fromstring(body)
+            for item in root.iterfind("s3:Contents", namespace):
+                key = item.findtext("s3:Key", "", namespace)
+                if KEY_PATTERN.fullmatch(key):
+                    modified = item.findtext("s3:LastModified", "", namespace)
+                    yield key, datetime.fromisoformat(modified.replace("Z", "+00:00"))
+            token = root.findtext("s3:NextContinuationToken", None, namespace)
+            if root.findtext("s3:IsTruncated", "", namespace) != "true" or not token:
+                break
+            query = {"list-type": "2", "prefix": prefix, "continuation-token": token}
+
+    async def modified(self, key: str) -> datetime | None:
+        async for found, modified in self.list(prefix=key):
+            if found == key:
+                return modified
+        return None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class ImageStore:
+    """
+    Хранилище изображений по содержимому.
+
+    backend: ImageBackend - бэкенд хранилища.
+    """
+
+    def __init__(self, backend: ImageBackend) -> None:
+        self.backend = backend
+
+    async def put(self, data: bytes) -> str:
+        """
+        Сохранение изображения.
+
+        Args:
+            data: Содержимое изображения.
+
+        Returns:
+            Ключ изображения.
+        """
+        key = get_key(data)
+        await self.backend.put(key, data)
+        return key
+
+    async def get(self, key: str) -> bytes:
+        """
+        Получение изображения.
+
+        Args:
+            key: Ключ изображения.
+        """
+        return await self.backend.get(key)
+
+    async def delete(self, keys: list[str]) -> None:
+        """
+        Удаление изображений, на которые больше нет ссылок.
+
+        Args:
+            keys: Ключи изображений.
+        """
+        for key in keys:
+            await self.backend.delete(key)
+
+    async def release(
+        self,
+        keys: list[str],
+        get_referenced: Callable[[list[str]], Awaitable[set[str]]],
+        grace: int,
+    ) -> int:
+        """
+        Удаление изображений удаленных вопросов.
+
+        Изображения, сохраненные меньше grace секунд назад, остаются сборке
+        мусора, а ссылки на остальные проверяются заново непосредственно
+        перед удалением: одновременно может создаваться вопрос с тем же
+        изображением.
+
+        Args:
+            keys: Ключи изображений, оставшихся без ссылок.
+            get_referenced: Функция получения ключей, на которые есть ссылки.
+            grace: Минимальный возраст удаляемого изображения в секундах.
+
+        Returns:
+            Количество удаленных изображений.
+        """
+        deadline = datetime.now(timezone.utc) - timedelta(seconds=grace)
+        old = []
+        for key in keys:
+            modified = await self.backend.modified(key)
+            if modified is not None and modified < deadline:
+                old.append(key)
+        if not old:
+            return 0
+        referenced = await get_referenced(old)
+        garbage = [key for key in old if key not in referenced]
+        await self.delete(garbage)
+        return len(garbage)
+
+    async def collect_garbage(self, referenced: set[str], grace: int) -> int:
+        """
+        Удаление изображений без ссылок.
+
+        Изображения, сохраненные меньше grace секунд назад, не удаляются,
+        так как вопрос с ними может еще создаваться.
+
+        Args:
+            referenced: Ключи изображений, на которые ссылаются вопросы.
+            grace: Минимальный возраст удаляемого изображения в секундах.
+
+        Returns:
+            Количество удаленных изображений.
+        """
+        deadline = datetime.now(timezone.utc) - timedelta(seconds=grace)
+        garbage = [
+            key
+            async for key, modified in self.backend.list()
+            if key not in referenced and modified < deadline
+        ]
+        await self.delete(garbage)
+        return len(garbage)
+
+    async def close(self) -> None:
+        """Освобождение ресурсов хранилища."""
+        await self.backend.close()
+
+
+def create_image_store(image_store_config: ImageStoreConfig) -> ImageStore:
+    """
+    Создание хранилища изображений по настройкам.
+
+    Args:
+        image_store_config: Настройки хранилища изображений.
+    """
+    if image_store_config.type == "local":
+        return ImageStore(LocalImageBackend(image_store_config.path))
+    if image_store_config.type == "s3":
+        return ImageStore(
+            S3ImageBackend(
+                url=image_store_config.url,
+                bucket=image_store_config.bucket,
+                access_key=image_store_config.access_key,
+                secret_key=image_store_config.secret_key,
+                region=image_store_config.region,
+            )
+        )
+    raise ValueError(f"Unknown image store type: {image_store_config.type}")
+
+
+image_store = create_image_store(config.images)
+
+
+async def _main(command: str) -> None:
+    from database.admin_connect import get_image_keys
+    from database.database import engine
+
+    if command != "gc":
+        raise SystemExit(f"Unknown command: {command}")
+    print(
+        await image_store.collect_garbage(
+            await get_image_keys(), grace=config.images.gc_grace
+        )
+    )
+    await image_store.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "gc"))
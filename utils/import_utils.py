@@ -0,0 +1,253 @@
+"""
+Утилиты импорта тестов из файла.
+
+Тест описывается файлом JSON или YAML:
+
+    title: Название теста
+    description: Описание теста
+    questions:
+      - text: Текст вопроса
+        answers: [Ответ 1, Ответ 2, Ответ 3, Ответ 4]
+        correct: 2          # номер правильного ответа, начиная с 1
+        image: img/1.jpg    # необязательно, путь в zip-архиве
+
+или файлом CSV с колонками question, answer_1 ... answer_N, correct и
+image, где название теста - имя файла. Файл вместе с изображениями можно
+загрузить zip-архивом.
+
+Классы:
+    ImportedQuestion - вопрос импортируемого теста.
+    ImportedTest - импортируемый тест.
+    TestImportError - ошибка импорта теста.
+
+Функции:
+    parse_test_file:
+        Разбор и проверка файла теста.
+    save_images:
+        Сохранение изображений импортированного теста в хранилище.
+"""
+
+import csv
+import io
+import json
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+import yaml
+
+from config import lexicon
+from utils.image_store import get_key, image_store
+
+TEST_SUFFIXES = (".json", ".yaml", ".yml", ".csv")
+# Максимальный размер распакованного архива в байтах
+MAX_ARCHIVE_SIZE = 100 * 1024 * 1024
+
+
+@dataclass(slots=True)
+class ImportedQuestion:
+    """
+    Вопрос импортируемого теста.
+
+    text: str - текст вопроса.
+    answers: dict[str, bool] - ответы и их правильность.
+    image: str | None - ключ изображения в хранилище.
+    """
+
+    text: str
+    answers: dict[str, bool]
+    image: str | None = None
+
+
+@dataclass(slots=True)
+class ImportedTest:
+    """
+    Импортируемый тест.
+
+    title: str - название теста.
+    description: str - описание теста.
+    questions: list[ImportedQuestion] - вопросы теста.
+    images: dict[str, bytes] - содержимое изображений по ключу.
+    """
+
+    title: str
+    description: str
+    questions: list[ImportedQuestion]
+    images: dict[str, bytes] = field(default_factory=dict)
+
+
+class TestImportError(ValueError):
+    """
+    Ошибка импорта теста.
+
+    errors: list[str] - описания найденных ошибок.
+    """
+
+    def __init__(self, errors: list[str]) -> None:
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+def _read_rows(name: str, content: bytes) -> tuple[str, str, list[dict]]:
+    suffix = PurePosixPath(name).suffix.lower()
+    text = content.decode("utf-8-sig")
+    if suffix == ".csv":
+        questions = []
+        for row in csv.DictReader(io.StringIO(text)):
+            answers = [
+                value
+                for key, value in sorted(
+                    (
+                        (int(key.removeprefix("answer_")), value)
+                        for key, value in row.items()
+                        if key and key.startswith("answer_")
+                    )
+                )
+                if value
+            ]
+            questions.append(
+                {
+                    "text": row.get("question"),
+                    "answers": answers,
+                    "correct": row.get("correct"),
+                    "image": row.get("image") or None,
+                }
+            )
+        return PurePosixPath(name).stem, "", questions
+
+    data = json.loads(text) if suffix == ".json" else yaml.safe_load(text)
+    if not isinstance(data, dict) or not isinstance(data.get("questions"), list):
+        raise ValueError("questions")
+    return data.get("title"), data.get("description") or "", data["questions"]
+
+
+def _validate(
+    title: str, description: str, rows: list[dict], files: dict[str, bytes]
+) -> ImportedTest:
+    errors = []
+    if not isinstance(title, str) or not title.strip():
+        errors.append(lexicon.MESSAGES["import no title"])
+    if not rows:
+        errors.append(lexicon.MESSAGES["import no questions"])
+
+    questions = []
+    images = {}
+    # путь в архиве -> ключ изображения в хранилище
+    image_keys: dict[str, str] = {}
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            row = {}
+        text = row.get("text")
+        answers = row.get("answers")
+        if not isinstance(answers, list):
+            answers = []
+        answers = [str(answer).strip() for answer in answers]
+        try:
+            correct = int(row.get("correct"))
+        except (TypeError, ValueError):
+            correct = 0
+        image = row.get("image")
+
+        if not isinstance(text, str) or not text.strip():
+            errors.append(
+                lexicon.MESSAGES["import question text"].format(number=number)
+            )
+        if len(answers) < 2 or len(set(answers)) < len(answers) or not all(answers):
+            errors.append(
+                lexicon.MESSAGES["import question answers"].format(number=number)
+            )
+        if not 1 <= correct <= len(answers):
+            errors.append(
+                lexicon.MESSAGES["import question correct"].format(number=number)
+            )
+        if image is not None and str(image) not in files:
+            errors.append(
+                lexicon.MESSAGES["import question image"].format(
+                    number=number, image=image
+                )
+            )
+        if errors:
+            continue
+
+        image_key = None
+        if image is not None:
+            if str(image) not in image_keys:
+                image_keys[str(image)] = get_key(files[str(image)])
+                images[image_keys[str(image)]] = files[str(image)]
+            image_key = image_keys[str(image)]
+        questions.append(
+            ImportedQuestion(
+                text=text.strip(),
+                answers={
+                    answer: index == correct
+                    for index, answer in enumerate(answers, start=1)
+                },
+                image=image_key,
+            )
+        )
+
+    if errors:
+        raise TestImportError(errors)
+    return ImportedTest(
+        title=title.strip(),
+        description=str(description).strip(),
+        questions=questions,
+        images=images,
+    )
+
+
+def parse_test_file(name: str, content: bytes) -> ImportedTest:
+    """
+    Разбор и проверка файла теста.
+
+    Args:
+        name: Имя загруженного файла.
+        content: Содержимое файла.
+
+    Returns:
+        Тест, готовый к сохранению.
+
+    Raises:
+        TestImportError: Файл не поддерживается или содержит ошибки.
+    """
+    files: dict[str, bytes] = {}
+    try:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                members = [
+                    member for member in archive.infolist() if not member.is_dir()
+                ]
+                if sum(member.file_size for member in members) > MAX_ARCHIVE_SIZE:
+                    raise ValueError("size")
+                files = {member.filename: archive.read(member) for member in members}
+            test_files = [
+                file for file in files if file.lower().endswith(TEST_SUFFIXES)
+            ]
+            if len(test_files) != 1:
+                raise ValueError("test file")
+            name = test_files[0]
+            content = files.pop(name)
+        elif not name.lower().endswith(TEST_SUFFIXES):
+            raise ValueError("suffix")
+        title, description, rows = _read_rows(name, content)
+    except (
+        ValueError,
+        KeyError,
+        UnicodeDecodeError,
+        zipfile.BadZipFile,
+        yaml.YAMLError,
+    ):
+        raise TestImportError([lexicon.MESSAGES["import bad file"]]) from None
+
+    return _validate(title, description, rows, files)
+
+
+async def save_images(images: dict[str, bytes]) -> None:
+    """
+    Сохранение изображений импортированного теста в хранилище.
+
+    Args:
+        images: Содержимое изображений по ключу.
+    """
+    for content in images.values():
+        await image_store.put(content)
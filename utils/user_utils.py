@@ -0,0 +1,146 @@
+"""
+Утилиты для пользователя.
+
+Состояние прохождения теста хранится в FSM в компактном виде, пригодном
+для любого хранилища:
+    test_id: int - id теста.
+    seed: int - зерно перестановок вопросов и ответов.
+    question_ids: list[int] - id вопросов в порядке показа.
+    position: int - номер текущего вопроса.
+    correct: int - битовая маска правильных ответов, бит i - вопрос i.
+    choices: str - номера выбранных ответов, символ i - вопрос i.
+
+Порядок ответов не хранится: он вычисляется из зерна и id вопроса при
+каждом показе, поэтому после перезапуска бота попытка продолжается с тем
+же расположением кнопок, а показанный порядок можно восстановить.
+
+Функции:
+    create_attempt:
+        Создание состояния прохождения теста.
+    get_answers:
+        Получение ответов на вопрос в порядке показа.
+    record_answer:
+        Запись ответа на текущий вопрос.
+    get_score:
+        Получение результата теста в баллах.
+    get_incorrect_answers:
+        Получение неправильных ответов.
+"""
+
+from random import Random, getrandbits
+
+from database.snapshot import AnswerSnapshot, QuestionSnapshot, TestSnapshot
+
+# Номер ответа кодируется символом, начиная с "0"
+CHOICE_OFFSET = ord("0")
+# Разрядность зерна попытки
+SEED_BITS = 32
+
+
+def create_attempt(
+    snapshot: TestSnapshot, shuffle_questions: bool = False, seed: int | None = None
+) -> dict:
+    """
+    Создание состояния прохождения теста.
+
+    Args:
+        snapshot: Снимок теста.
+        shuffle_questions: Перемешать ли вопросы.
+        seed: Зерно перестановок, случайное, если не задано.
+
+    Returns:
+        Состояние прохождения теста.
+    """
+    if seed is None:
+        seed = getrandbits(SEED_BITS)
+    question_ids = [question.id for question in snapshot.questions]
+    if shuffle_questions:
+        Random(f"{seed}:questions").shuffle(question_ids)
+    return {
+        "test_id": snapshot.id,
+        "seed": seed,
+        "question_ids": question_ids,
+        "position": 0,
+        "correct": 0,
+        "choices": "",
+    }
+
+
+def get_answers(attempt: dict, question: QuestionSnapshot) -> list[AnswerSnapshot]:
+    """
+    Получение ответов на вопрос в порядке показа.
+
+    Порядок зависит только от зерна попытки и id вопроса. Снимок вопроса
+    не изменяется.
+
+    Args:
+        attempt: Состояние прохождения теста.
+        question: Вопрос.
+
+    Returns:
+        Ответы в порядке показа.
+    """
+    answers = list(question.answers)
+    # Попытки, начатые до появления зерна, получают порядок зерна 0
+    Random(f"{attempt.get('seed', 0)}:{question.id}").shuffle(answers)
+    return answers
+
+
+def record_answer(
+    attempt: dict, question: QuestionSnapshot, answer: AnswerSnapshot
+) -> dict:
+    """
+    Запись ответа на текущий вопрос.
+
+    Args:
+        attempt: Состояние прохождения теста.
+        question: Текущий вопрос.
+        answer: Выбранный ответ.
+
+    Returns:
+        Изменившиеся поля состояния.
+    """
+    position = attempt["position"]
+    correct = attempt["correct"]
+    if answer.is_correct:
+        correct |= 1 << position
+    choice = chr(CHOICE_OFFSET + question.answers.index(answer))
+    return {
+        "position": position + 1,
+        "correct": correct,
+        "choices": attempt["choices"] + choice,
+    }
+
+
+def get_score(attempt: dict) -> int:
+    """
+    Получение результата теста в баллах.
+
+    Args:
+        attempt: Состояние прохождения теста.
+    """
+    total = len(attempt["question_ids"])
+    return round(attempt["correct"].bit_count() / total * 100)
+
+
+def get_incorrect_answers(
+    attempt: dict, snapshot: TestSnapshot
+) -> list[tuple[int, int]]:
+    """
+    Получение неправильных ответов.
+
+    Args:
+        attempt: Состояние прохождения теста.
+        snapshot: Снимок теста.
+
+    Returns:
+        Пары id вопроса и id выбранного ответа.
+    """
+    incorrect_answers = []
+    for position, question_id in enumerate(attempt["question_ids"]):
+        if attempt["correct"] >> position & 1:
+            continue
+        question = snapshot.get_question(question_id)
+        answer = question.answers[ord(attempt["choices"][position]) - CHOICE_OFFSET]
+        incorrect_answers.append((question_id, answer.id))
+    return incorrect_answers
@@ -0,0 +1,106 @@
+"""
+The webhook module.
+
+Serves Telegram updates over HTTP as an alternative to long polling.
+
+Classes:
+    BoundedRequestHandler - webhook handler with bounded concurrency.
+
+Functions:
+    create_app:
+        Creates the aiohttp application that feeds updates to the dispatcher.
+    run_webhook:
+        Registers the webhook and serves the application until stopped.
+"""
+
+import asyncio
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import WebhookConfig
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler with bounded concurrency.
+
+    Telegram gets its response right away, while at most max_concurrency
+    updates are processed at the same time; the rest wait for a slot.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_concurrency: int,
+        secret_token: str | None = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.tasks: set[asyncio.Task] = set()
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        async with self.semaphore:
+            await super()._background_feed_update(bot=bot, update=update)
+
+    async def _handle_request_background(
+        self, bot: Bot, request: web.Request
+    ) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        task = asyncio.create_task(self._background_feed_update(bot, update))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self) -> None:
+        """Wait for updates in progress and close the bot session."""
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        await super().close()
+
+
+def create_app(
+    dispatcher: Dispatcher, bot: Bot, webhook_config: WebhookConfig
+) -> web.Application:
+    """Creates the aiohttp application that feeds updates to the dispatcher."""
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        max_concurrency=webhook_config.max_concurrency,
+        secret_token=webhook_config.secret or None,
+    )
+    handler.register(app, path=webhook_config.path)
+    app["webhook_handler"] = handler
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def run_webhook(
+    dispatcher: Dispatcher, bot: Bot, webhook_config: WebhookConfig
+) -> None:
+    """Registers the webhook and serves the application until stopped."""
+    await bot.set_webhook(
+        url=webhook_config.url.rstrip("/") + webhook_config.path,
+        secret_token=webhook_config.secret or None,
+        drop_pending_updates=True,
+    )
+
+    runner = web.AppRunner(create_app(dispatcher, bot, webhook_config))
+    await runner.setup()
+    site = web.TCPSite(runner, host=webhook_config.host, port=webhook_config.port)
+    await site.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()